@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+EPS Model (Batched)
+A version of the EPS model (eps.py) with behaviors written to work on batches of scenarios
+
+The behaviors of the functions in this model are written so that they work both on single scenarios and on the
+arrays of states used when the model is batched (see Model.to_batch()), so that sets of scenarios can be run in 
+lockstep with propagate.single_faults(..., batch=size). Conditional behaviors are written using select() (which 
+returns the choice for the first true condition, like an if/elif/else statement) and has_fault_mask().
+"""
+import numpy as np
+from fmdtools.modeldef import Model, select
+from eps import *
+
+class ImportEEBatch(ImportEE):
+    def behavior(self,time):
+        self.EEout.effort = select([self.has_fault_mask('no_v'), self.has_fault_mask('high_v'), self.has_fault_mask('low_v')], \
+                                   [0.0, 2.0, 0.5], 1.0)
+
+class ImportSigBatch(ImportSig):
+    def behavior(self,time):
+        self.Sigout.value = select([self.has_fault_mask('partial_signal'), self.has_fault_mask('no_signal')], [0.5, 0.0], 1.0)
+
+class StoreEEBatch(StoreEE):
+    def behavior(self,time):
+        faults = [self.has_fault_mask('no_storage'), self.has_fault_mask('low_storage')]
+        self.EEout.effort = select(faults, [0.0, 1.0], self.EEin.effort)
+        self.EEout.rate = select(faults, [self.EEout.rate, 0.5], 1.0)
+
+class SupplyEEBatch(SupplyEE):
+    def condfaults(self,time):
+        self.add_fault_mask('short', self.EEout.rate > 2.0)
+        self.add_fault_mask('open_circuit', (self.EEout.rate > 1.0) & (self.EEout.rate <= 2.0))
+    def behavior(self, time):
+        faults = [self.has_fault_mask(fault) for fault in ['open_circuit', 'short', 'major_overload', 'minor_overload', 'adverse_resist']]
+        self.EEout.effort = select(faults, [0.0, self.EEin.effort*4.0, self.EEin.effort+1.0, 4.0, self.EEin.effort - 1.0], self.EEin.effort)
+        self.EEin.rate = select(faults[:2], [1.0, self.EEout.rate], self.EEin.rate)
+        self.Heatout.effort = select(faults, [self.Heatout.effort, self.Heatout.effort, 2.0, 4.0, self.Heatout.effort], 1.0)
+
+class DistEEBatch(DistEE):
+    def condfaults(self,time):
+        self.add_fault_mask('short', np.maximum.reduce([self.EEoutM.rate,self.EEoutH.rate,self.EEoutO.rate]) > 2.0)
+    def behavior(self,time):
+        faults = [self.has_fault_mask('short'), self.has_fault_mask('open_circuit') | (self.Sigin.value <= 0.0), \
+                  self.has_faults_mask(['poor_alloc', 'adverse_resist']) | (self.Sigin.value<1.0)]
+        self.EEin.rate = select(faults[:2], [self.EEin.effort*4.0, 0.0], np.maximum.reduce([self.EEoutM.rate,self.EEoutH.rate,self.EEoutO.rate]))
+        effort = select(faults, [0.0, 0.0, self.EEin.effort - 1.0], self.EEin.effort)
+        self.EEoutM.effort = effort
+        self.EEoutH.effort = effort
+        self.EEoutO.effort = effort
+
+class ExportHEBatch(ExportHE):
+    def behavior(self,time):
+        self.HE_in.effort = select([self.has_fault_mask('ineffective_sink'), self.has_fault_mask('hot_sink')], [4.0, 2.0], 1.0)
+
+class EEtoMEBatch(EEtoME):
+    def behavior(self, time):
+        faults = [self.has_fault_mask(fault) for fault in ['high_torque', 'low_torque', 'toohigh_torque', 'open_circuit', 'short']]
+        effort, rate = self.EE_in.effort, self.ME_out.rate
+        self.HE_out.rate = select(faults, [effort + 1.0, effort - 1.0, 4.0, 0.0, effort], effort)
+        self.ME_out.effort = select(faults, [effort + 1.0, effort - 1.0, 4.0, 0.0, 0.0], effort)
+        self.ME_out.rate = select(faults, [rate, rate, rate, 0.0, 0.0], effort)
+        self.EE_in.rate = select(faults, [1.0/(rate+0.001) -1.0, 1.0/(rate+0.001) -1.0, 4.0, 0.0, effort * 4.0], effort)
+
+class EEtoHEBatch(EEtoHE):
+    def behavior(self, time):
+        faults = [self.has_fault_mask(fault) for fault in ['open_circuit', 'low_heat', 'high_heat', 'toohigh_heat']]
+        self.HE_out.effort = select(faults, [0.0, self.EE_in.effort -1.0, self.EE_in.effort +1.0, 4.0], self.EE_in.effort)
+        self.EE_in.rate = select(faults, [0.0, self.EE_in.effort, self.EE_in.effort+1.0, 4.0], self.EE_in.effort)
+
+class EEtoOEBatch(EEtoOE):
+    def behavior(self,time):
+        faults = [self.has_fault_mask('burnt_out'), self.has_fault_mask('optical_resist')]
+        effort = select(faults, [0.0, self.EE_in.effort - 1.0], self.EE_in.effort)
+        self.EE_in.rate = effort
+        self.HE_out.effort = effort
+        self.OE_out.effort = effort
+
+class EPSBatch(EPS):
+    def __init__(self, params={}):
+        Model.__init__(self, params=params)
+        
+        self.add_flow('EE_1', {'rate':1.0, 'effort':1.0})
+        self.add_flow('EE_2', {'rate':1.0, 'effort':1.0})
+        self.add_flow('EE_3', {'rate':1.0, 'effort':1.0})
+        self.add_flow('EE_M', {'rate':1.0, 'effort':1.0})
+        self.add_flow('EE_O', {'rate':1.0, 'effort':1.0})
+        self.add_flow('EE_H', {'rate':1.0, 'effort':1.0})
+        self.add_flow('ME', {'rate':1.0, 'effort':1.0})
+        self.add_flow('OE', {'rate':1.0, 'effort':1.0})
+        self.add_flow('HE', {'rate':1.0, 'effort':1.0})
+        self.add_flow('waste_HE_1', {'rate':1.0, 'effort':1.0})
+        self.add_flow('waste_HE_O', {'rate':1.0, 'effort':1.0})
+        self.add_flow('waste_HE_M', {'rate':1.0, 'effort':1.0})
+        self.add_flow('Sig_In', {'value':1.0})
+        
+        self.add_fxn('Import_EE',['EE_1'],fclass=ImportEEBatch)
+        self.add_fxn('Supply_EE',['EE_1', 'EE_2','waste_HE_1'],fclass=SupplyEEBatch)
+        self.add_fxn('Store_EE',['EE_2', 'EE_3'],fclass=StoreEEBatch)
+        self.add_fxn('Import_Signal',['Sig_In'],fclass=ImportSigBatch)
+        self.add_fxn('Distribute_EE',['Sig_In', 'EE_3', 'EE_M', 'EE_H', 'EE_O'],fclass=DistEEBatch)
+        self.add_fxn('EE_to_ME', ['EE_M', 'ME', 'waste_HE_M'], fclass=EEtoMEBatch)
+        self.add_fxn('EE_to_OE', ['EE_O', 'OE', 'waste_HE_O'], fclass=EEtoOEBatch)
+        self.add_fxn('EE_to_HE', ['EE_H','HE'], fclass = EEtoHEBatch)
+        self.add_fxn('Export_ME', ['ME'], fclass = ExportME)
+        self.add_fxn('Export_HE', ['HE'], fclass = ExportHEBatch)
+        self.add_fxn('Export_OE', ['OE'], fclass = ExportOE)
+        self.add_fxn('Export_waste_H1', ['waste_HE_1'], fclass = ExportHEBatch)
+        self.add_fxn('Export_waste_HO', ['waste_HE_O'], fclass = ExportHEBatch)
+        self.add_fxn('Export_waste_HM', ['waste_HE_M'], fclass = ExportHEBatch)
+        
+        self.construct_graph()
@@ -9,28 +9,97 @@ Description: functions to propagate faults through a user-defined fault model
 Main Methods:
     - nominal():            Runs the model over time in the nominal scenario.
     - one_fault():          Runs one fault in the model at a specified time.
+    - faults_at():          Runs each of a list of faults in the model at specified times (sharing one nominal run)
     - singlefaults():       Creates and propagates a list of failure scenarios in a model over given model times
     - approach:             Injects and propagates faults in the model defined by a given sample approach.   
+    - iter_approach():      Runs the scenarios in a sample approach, yielding the results of each scenario as they are run
+    - cache_nominal():      Enables (or disables) caching the results of nominal runs to re-use in later calls to the methods above
+    - clear_nomcache():     Clears the cache of nominal runs
+    - profile_propagation():Enables (or disables) profiling the functions and time-steps in propagate()
+    - get_profile():        Returns the profile of propagate() recorded since profiling was enabled (or last cleared)
+    - clear_profile():      Clears the profile of propagate()
 Private Methods:
+    - exec_one_fault():     Runs one fault in the model at a specified time and compares the result with the nominal run
     - list_init_faults():   Creates a list of single-fault scenarios for the graph, given the modes set up in the fault model
+    - run_scenlist():       Runs the nominal scenario and then each scenario in a list of fault scenarios (serially, in a process pool, or in batches)
+    - iter_scenlist():      Runs the nominal scenario and then each scenario in a list of fault scenarios, yielding the results of each
+        - order_scenlist(): Orders a list of fault scenarios by the bound on (or rate of) their expected cost
+        - exec_scenlist():  Runs each scenario in a list of fault scenarios (serially, in a process pool, or in batches) after the nominal scenario
+        - join_hist():      Joins a history sent back from a worker process with the nominal history
+        - run_nominal():    Runs the nominal scenario in the model (or returns the cached run)
+            - nomcache_key():   Returns the key of a nominal run in the cache of nominal runs
+            - get_nomcache():   Returns the results of a nominal run from the cache (if present)
+            - add_nomcache():   Adds the results of a nominal run to the cache (evicting the least recently used runs)
+                - hist_nbytes():Returns the number of bytes in the arrays of a history
+                - hashable():   Converts a (nested) structure of parameters into a hashable structure
+        - exec_scen():      Runs a single fault scenario and classifies the result against the nominal run
+            - classify_scen():  Classifies the result of a fault scenario against the nominal run
+        - init_scen_mdl():  Returns a model in its initial state to run a scenario in (a new instance or the reset model)
+            - mdl_diffs():  Returns a list of the states of the flows, functions, etc. in a model that differ from another model
+            - block_diffs(): Returns a list of the states of a function or component that differ from another state
+            - state_diffs(): Returns a list of the values in a state dict that differ from another state dict
+        - set_staged():     Sets the model to its state in the nominal run at a given time (replaying the nominal run from the nearest earlier saved state, and optionally verifying it)
+        - init_worker():    Instantiates the model and runs the nominal scenario in a worker process
+        - exec_scen_par():  Runs a fault scenario in a worker process
+        - exec_dedup():     Runs a list of staged fault scenarios, reusing the results of scenarios which are the same up to a shift in time
+            - reuse_times():    Returns the time a scenario can reuse the results of an earlier scenario up to (and the time to run it from after)
+            - shift_state():    Returns a copy of a model state with the times of the functions shifted
+            - shift_hist():     Returns a copy of a history with the values over a range of time-steps replaced by the (shifted) values of another
+        - exec_batch():     Runs a batch of fault scenarios in lockstep in a batched model and classifies the result of each
+            - prop_batch():     Injects and propagates faults through a batched model at one time-step
+            - prop_batch_time():Propagates faults through a batched model (keeping the active functions, etc. of each scenario)
+            - update_batch_fxn():Updates a function in a batched model in the given scenarios
+            - batch_status():   Returns the status of a flow in a batched model
+            - batch_diff():     Returns the scenarios where the status of a flow in a batched model changed
+            - batch_row_state():Returns the state of a scenario in a batched model (to detect loops)
+            - bind_batchhist(): Binds the history of a batched model to the states it records
+            - record_batchhist():Records the states of a batched model in its history at a given time
+            - split_batchhist():Returns the history of a scenario from the history of a batched model
     - prop_one_scen():      Runs a fault scenario in the model over time
+        - converged():      Checks whether the states in a model history are the same as in the nominal history at a given time
+        - tracks_all():     Checks whether a track specification includes every state of the model (to check convergence)
+        - fill_hist():      Fills the rest of a model history from the nominal history (after re-converging)
+            - fill_vals():  Fills each array in a history after a given index with the values in another history
+        - steady_state():   Returns the state of the model used to check whether it is in a steady state
+        - same_state():     Checks whether two states from steady_state() are the same
     - propagate():          Injects and propagates faults through the graph at one time-step
     - prop_time():          Propagates faults through model graph.
-    - update_mdlhist():     Updates the model history at a given time.
-        - update_flowhist():Updates the flows in the model history at t_ind
-        - update_fxnhist(): Updates the functions (faults and states) in the model history at t_ind
+        - loop_event():     Returns a record of a loop in the propagation of the model at a given time-step
+        - scen_loops():     Returns the loops in propagation from the fault time of a scenario onward
+        - update_profile(): Updates a function in the profile with the time taken by a call to updatefxn()
+    - bind_mdlhist():       Binds the arrays in the model history to the model states they record
+    - record_mdlhist():     Records the model states in the model history at a given time (using the bindings)
+    - update_mdlhist():     Updates the model history at a given time (binding and recording the model states)
+    - HistSplice:           History of a flow/function in a staged scenario which shares the values before the scenario with the nominal history
+        - splice_hist():    Splices the history of a staged scenario onto the history it was staged from
+        - split_hist():     Splits a spliced history into the part stored in the scenario (e.g. to send it between processes)
+        - copy_suffix():    Copies the values of a history from a given index onward
+    - encode_faults():      Encodes a set of faults as an integer bitmask using the fault modes of the function
     - init_mdlhist():       Initializes the model history over a given timerange
+        - get_trackspec():  Returns the full specification of the states to track in the model given the track argument
+        - get_recinds():    Returns the indices of the time-steps in the model time range to record the model history at
         - init_flowhist():  Initializes the flow history flowhist of the model mdl over the time range timerange
         - init_fxnhist():   Initializes the function state history fxnhist of the model mdl over the time range timerange
+        - init_timerhist(): Initializes the history of the function timers of the model mdl over the time range timerange
 """
 
+import os
 import numpy as np
 import copy
+import concurrent.futures as cf
+import collections
+import itertools
+import heapq
+import bisect
+import warnings
+from time import perf_counter
 import fmdtools.resultdisp.process as proc
+import fmdtools.resultdisp.store as store
+from fmdtools.modeldef import Flow, Block, Timer, is_scalar, copy_state
 
 ## FAULT PROPAGATION
 
-def nominal(mdl, track=True, gtype='normal'):
+def nominal(mdl, track=True, gtype='normal', skip_steady=False):
     """
     Runs the model over time in the nominal scenario.
 
@@ -38,10 +107,16 @@ def nominal(mdl, track=True, gtype='normal'):
     ----------
     mdl : Model
         Model of the system
-    track : BOOL, optional
-        Whether or not to track flows. The default is True.
+    track : bool or dict, optional
+        Whether to track states over time (True or False), or a dict specifying which states to track with structure
+        {'functions':{fxnname:[states]}, 'flows':{flowname:[attributes]}, 'faults':bool, 'timers':bool}, where
+        missing functions/flows are not tracked, faults are tracked by default, and timers are not. The dict may also
+        specify 'stride':int to only record every stride-th time-step and 'window':int to also record every
+        time-step within window steps of the fault times (see get_trackspec()). The default is True.
     gtype : TYPE, optional
         The type of graph to return (normal or bipartite). The default is 'normal'.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (see approach()). The default is False.
 
     Returns
     -------
@@ -54,19 +129,25 @@ def nominal(mdl, track=True, gtype='normal'):
     """
     mdl = mdl.__class__(params=mdl.params)
     nomscen=construct_nomscen(mdl)
+    if track: track = get_trackspec(mdl, track)
+    key = nomcache_key(mdl, 'nominal', nomscen, track, gtype, skip_steady)
+    results = get_nomcache(key)
+    if results: return results
     scen=nomscen.copy()
-    mdlhist, _ = prop_one_scen(mdl, nomscen, track=track, staged=False)
+    mdlhist, _, _ = prop_one_scen(mdl, nomscen, track=track, staged=False, skip_steady=skip_steady)
     
     resgraph = mdl.return_stategraph(gtype=gtype)   
     endfaults, endfaultprops = mdl.return_faultmodes()
     endclass=mdl.find_classification(resgraph, endfaultprops, construct_nomscen(mdl), scen, {'nominal': mdlhist, 'faulty':mdlhist})
+    if scen_loops(mdl, scen): endclass['loops'] = scen_loops(mdl, scen)
     
     endresults={'faults': endfaults, 'classification':endclass}
     
     mdl.reset()
+    add_nomcache(key, (endresults, resgraph, mdlhist), mdlhist)
     return endresults, resgraph, mdlhist
 
-def one_fault(mdl, fxnname, faultmode, time=1, track=True, staged=False, gtype = 'normal'):
+def one_fault(mdl, fxnname, faultmode, time=1, track=True, staged=False, gtype = 'normal', converge=False, skip_steady=False):
     """
     Runs one fault in the model at a specified time.
 
@@ -80,12 +161,23 @@ def one_fault(mdl, fxnname, faultmode, time=1, track=True, staged=False, gtype =
         Name of the faultmode
     time : float, optional
         Time to inject fault. Must be in the range of model times (i.e. in range(0, end, mdl.tstep)). The default is 0.
-    track : bool, optional
-        Whether to track model states over time. The default is True.
+    track : bool or dict, optional
+        Whether to track states over time (True or False), or a dict specifying which states to track with structure
+        {'functions':{fxnname:[states]}, 'flows':{flowname:[attributes]}, 'faults':bool, 'timers':bool}, where
+        missing functions/flows are not tracked, faults are tracked by default, and timers are not. The dict may also
+        specify 'stride':int to only record every stride-th time-step and 'window':int to also record every
+        time-step within window steps of the fault times (see get_trackspec()). The default is True.
     staged : bool, optional
         Whether to inject the fault in a copy of the nominal model at the fault time (True) or instantiate a new model for the fault (False). The default is False.
     gtype : str, optional
         The graph type to return ('bipartite' or 'normal'). The default is 'normal'.
+    converge : bool, optional
+        Whether to stop simulating a fault scenario when the model re-converges to the nominal scenario (i.e. when the 
+        flow values, function states, faults, and timers recorded at a time are the same as in the nominal history), 
+        filling the rest of the history with the nominal history. Requires tracking every flow value, function state, 
+        fault, and timer (see tracks_all()). Note that component states are not compared. The default is False.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (see approach()). The default is False.
 
     Returns
     -------
@@ -100,18 +192,60 @@ def one_fault(mdl, fxnname, faultmode, time=1, track=True, staged=False, gtype =
     #run model nominally, get relevant results
     mdl = mdl.__class__(params=mdl.params)
     nomscen=construct_nomscen(mdl)
-    if staged:
-        nommdlhist, mdls = prop_one_scen(mdl, nomscen, track=track, staged=staged, ctimes=[time])
-        nomresgraph = mdl.return_stategraph(gtype)
-        mdl.reset()
-        mdl = mdls[time]
-    else:
-        nommdlhist, _ = prop_one_scen(mdl, nomscen, track=track, staged=staged)
-        nomresgraph = mdl.return_stategraph(gtype)
-        mdl.reset()
-        mdl = mdl.__class__(params=mdl.params)
+    if track: track = get_trackspec(mdl, track, faulttimes=[time])
+    nommdlhist, nomresgraph, c_mdl = run_nominal(mdl, nomscen, track=track, staged=staged, ctimes=[time], gtype=gtype, skip_steady=skip_steady)
+    return exec_one_fault(mdl, fxnname, faultmode, time, nommdlhist, nomresgraph, c_mdl, track=track, staged=staged, gtype=gtype, converge=converge, skip_steady=skip_steady)
+
+def faults_at(mdl, faultlist, track=True, staged=True, gtype='normal', converge=False, reuse=False, skip_steady=False):
+    """
+    Runs each of a list of faults in the model at a specified time (as in one_fault()), running the nominal 
+    scenario only once (and, if staged, only copying the nominal model at the times of the faults).
+
+    Parameters
+    ----------
+    mdl : Model
+        The model to inject the faults in.
+    faultlist : list
+        List of faults to run with structure [(fxnname, faultmode, time)]
+    track : bool or dict, optional
+        Whether to track states over time (or which states to track, see one_fault()). The default is True.
+    staged : bool, optional
+        Whether to inject each fault in a copy of the nominal model at the fault time (True) or instantiate a new 
+        model for each fault (False). The default is True.
+    gtype : str, optional
+        The graph type to return ('bipartite' or 'normal'). The default is 'normal'.
+    converge : bool, optional
+        Whether to stop simulating each fault when the model re-converges to the nominal scenario (see one_fault()).
+        The default is False.
+    reuse : bool or str, optional
+        Whether to reset and reuse the model for each fault if not staged (see approach()). The default is False.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (see approach()). The default is False.
+
+    Returns
+    -------
+    results : dict
+        The results of each fault, with structure {(fxnname, faultmode, time):(endresults, resgraph, mdlhists)},
+        where endresults, resgraph, and mdlhists are as returned by one_fault()
+    """
+    mdl = mdl.__class__(params=mdl.params)
+    nomscen=construct_nomscen(mdl)
+    times = sorted(set(time for _, _, time in faultlist))
+    if track: track = get_trackspec(mdl, track, faulttimes=times)
+    nommdlhist, nomresgraph, c_mdl = run_nominal(mdl, nomscen, track=track, staged=staged, ctimes=times, gtype=gtype, skip_steady=skip_steady)
+    return {(fxnname, faultmode, time): exec_one_fault(mdl, fxnname, faultmode, time, nommdlhist, nomresgraph, c_mdl, \
+                                                       track=track, staged=staged, gtype=gtype, converge=converge, reuse=reuse, skip_steady=skip_steady) \
+            for fxnname, faultmode, time in faultlist}
+
+def exec_one_fault(mdl, fxnname, faultmode, time, nommdlhist, nomresgraph, c_mdl, track=True, staged=False, gtype='normal', converge=False, reuse=False, skip_steady=False):
+    """
+    Runs one fault in the model at a specified time and compares the result with the nominal run (from run_nominal()).
+    Takes the arguments of one_fault() (and reuse, see faults_at()) and returns the same results.
+    """
+    if staged:  set_staged(mdl, c_mdl, time, verify=reuse=='verify')
+    else:       mdl = init_scen_mdl(mdl, reuse)
     #run with fault present, get relevant results
-    scen=nomscen.copy() #note: this is a shallow copy, so don't define it earlier
+    scen=construct_nomscen(mdl)
     scen['faults'][fxnname]=faultmode
     scen['properties']['type']='single fault'
     scen['properties']['function']=fxnname
@@ -122,14 +256,16 @@ def one_fault(mdl, fxnname, faultmode, time=1, track=True, staged=False, gtype =
         scen['properties']['rate'] = mdl.fxns[fxnname].failrate*mdl.fxns[fxnname].faultmodes[faultmode]['dist']
     scen['properties']['time']=time
     
-    faultmdlhist, _ = prop_one_scen(mdl, scen, track=track, staged=staged, prevhist=nommdlhist)
+    faultmdlhist, _, t_conv = prop_one_scen(mdl, scen, track=track, staged=staged, prevhist=nommdlhist, converge=converge, skip_steady=skip_steady)
+    if t_conv is not None: mdl.set_state(c_mdl[max(c_mdl)]) #if the scenario re-converged, it ends in the nominal state
     faultresgraph = mdl.return_stategraph(gtype)
+    endfaults, endfaultprops = mdl.return_faultmodes()
     
     #process model run
-    endfaults, endfaultprops = mdl.return_faultmodes()
     endflows = proc.graphflows(faultresgraph, nomresgraph, gtype)
     mdlhists={'nominal':nommdlhist, 'faulty':faultmdlhist}
     endclass = mdl.find_classification(faultresgraph, endfaultprops, endflows, scen, mdlhists)
+    if scen_loops(mdl, scen): endclass['loops'] = scen_loops(mdl, scen)
     resgraph = proc.resultsgraph(faultresgraph, nomresgraph, gtype=gtype) 
     
     endresults={'flows': endflows, 'faults': endfaults, 'classification':endclass}  
@@ -137,7 +273,7 @@ def one_fault(mdl, fxnname, faultmode, time=1, track=True, staged=False, gtype =
     mdl.reset()
     return endresults,resgraph, mdlhists
 
-def single_faults(mdl, staged=False, track=True):
+def single_faults(mdl, staged=False, track=True, pool=False, cstride=1, converge=False, journal=False, journal_hists=True, reuse=False, skip_steady=False, batch=False, dedup=False, costtol=False):
     """
     Creates and propagates a list of failure scenarios in a model
 
@@ -147,8 +283,69 @@ def single_faults(mdl, staged=False, track=True):
         The model to inject faults in
     staged : bool, optional
         Whether to inject the fault in a copy of the nominal model at the fault time (True) or instantiate a new model for the fault (False). Setting to True roughly halves execution time. The default is False.
-    track : bool, optional
-        Whether to track states over time. The default is True.
+    track : bool or dict, optional
+        Whether to track states over time (True or False), or a dict specifying which states to track with structure
+        {'functions':{fxnname:[states]}, 'flows':{flowname:[attributes]}, 'faults':bool, 'timers':bool}, where
+        missing functions/flows are not tracked, faults are tracked by default, and timers are not. The dict may also
+        specify 'stride':int to only record every stride-th time-step and 'window':int to also record every
+        time-step within window steps of the fault times (see get_trackspec()). The default is True.
+    pool : int or function, optional
+        Number of worker processes to run the scenarios in (using a concurrent.futures.ProcessPoolExecutor), or a 
+        function returning a concurrent.futures executor to run them in given the keyword arguments initializer 
+        and initargs (e.g. functools.partial(ProcessPoolExecutor, max_workers=4)), which are used to send the model 
+        class and parameters (and run the nominal scenario) once per worker. Pool objects which are already created 
+        (e.g. a multiprocessing.Pool) are not accepted, since their workers cannot be initialized this way. At most 
+        twice as many scenarios as workers are submitted at once. The default is False, which runs the 
+        scenarios serially.
+    cstride : int, optional
+        Stride of the (sorted) scenario times to copy the nominal model at in staged execution (e.g. 10 copies the
+        model at every 10th time). Scenarios between copies are started from the nearest earlier copy by replaying
+        the nominal run up to the scenario time, trading some computation for memory. The default is 1.
+    converge : bool, optional
+        Whether to stop simulating a fault scenario when the model re-converges to the nominal scenario (i.e. when the 
+        flow values, function states, faults, and timers recorded at a time are the same as in the nominal history), 
+        filling the rest of the history with the nominal history. Requires tracking every flow value, function state, 
+        fault, and timer (see tracks_all()). Note that component states are not compared. The default is False.
+    journal : str, optional
+        Directory to save the endclass (and history) of each scenario in as it is finished (see rd.store). If the
+        directory already has saved scenarios (e.g. from a run that was stopped), they are loaded instead of being
+        run again, so the run resumes where it stopped. The default is False (no journal).
+    journal_hists : bool, optional
+        Whether to save the history of each scenario in the journal (if False, scenarios loaded from the journal
+        have empty histories). The default is True.
+    reuse : bool or str, optional
+        Whether to reset and reuse one instance of the model (per process) for each scenario if not staged (True) 
+        instead of instantiating a new model for each scenario (False). 'verify' also checks that the state of the 
+        model after Model.reset() is the same as the state of a new instance after Model.reset() (or, if staged, 
+        that the state the model is set to at the time of each scenario is the same as the state of a new instance 
+        run to that time), raising an exception if not (e.g. to check that a model can be reused, or that every 
+        attribute its behaviors keep between time-steps is a declared state or listed in _savedatts, see 
+        Model.get_state()). The default is False.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (i.e. when no state, fault, or timer 
+        changed in the last time-step), to the next time a fault is injected, a phase starts or ends, or the model 
+        is copied (recording the held states in the history in between). Only valid for models where behaviors do 
+        not depend on time except through these events. The default is False.
+    batch : int, optional
+        Number of scenarios to run at once in lockstep in a batched copy of the model, where each state is an array 
+        over the scenarios (see Model.to_batch() and exec_batch()). Only valid for models with behaviors written to 
+        work on these arrays (e.g. using has_fault_mask() and select()). Cannot be used with pool, and staged, 
+        converge, reuse, and skip_steady do not apply to batched scenarios. The default is False (each scenario is 
+        run separately).
+    dedup : bool, optional
+        Whether to reuse the results of staged scenarios that inject the same faults into the same model state within
+        a phase (which are the same up to a shift in time) instead of running each (see exec_dedup()). Requires 
+        staged=True and recording every time-step, and is only valid for models where behaviors do not depend on 
+        time except through the phases. Reused scenarios are marked with 'reused' in their endclass, and the runs 
+        saved can be summarized with tabulate.dedupsummary(). The default is False.
+    costtol : float, optional
+        Tolerance on the error in the total expected cost of the scenarios. If given, the scenarios are run in order
+        of the bound on their expected cost from Model.expcost_bound() (or of their rate, if not bounded), and the
+        run is stopped once the expected cost of the scenarios not yet run is bounded by costtol (so all are run, 
+        with a warning, if no scenario is bounded). The bound after each scenario is recorded in its endclass as 
+        'error bound' (see process.totalcost_error()), and the scenarios run are returned in their original order. 
+        In a pool, the scenarios not yet started at the stop are cancelled (so only those already running, at most 
+        twice the number of workers, are run past it). The default is False (every scenario is run, in order).
 
     Returns
     -------
@@ -157,37 +354,11 @@ def single_faults(mdl, staged=False, track=True):
     mdlhists : dict
         A dictionary with the history of all model states for each scenario (including the nominal)
     """
-
     scenlist=list_init_faults(mdl)
-    #run model nominally, get relevant results
     nomscen=construct_nomscen(mdl)
-    mdl = mdl.__class__(params=mdl.params)
-    if staged:
-        nomhist, c_mdl = prop_one_scen(mdl, nomscen, track=track, ctimes=mdl.times)
-    else:
-        nomhist, c_mdl = prop_one_scen(mdl, nomscen, track=track)
-    nomresgraph = mdl.return_stategraph()
-    mdl.reset()
-    
-    endclasses = {}
-    mdlhists = {}
-    mdlhists['nominal'] = nomhist
-    for i, scen in enumerate(scenlist):
-        #run model with fault scenario
-        if staged:
-            mdl=c_mdl[scen['properties']['time']].copy()
-            mdlhists[scen['properties']['name']], _ =prop_one_scen(mdl, scen, track=track, staged=True, prevhist=nomhist)
-        else:
-            mdl = mdl.__class__(params=mdl.params)
-            mdlhists[scen['properties']['name']], _ =prop_one_scen(mdl, scen, track=track)
-        endfaults, endfaultprops = mdl.return_faultmodes()
-        resgraph = mdl.return_stategraph()
-        endflows = proc.graphflows(resgraph, nomresgraph)
-        endclasses[scen['properties']['name']] = mdl.find_classification(resgraph, endfaultprops, endflows, scen, {'nominal':nomhist, 'faulty':mdlhists[scen['properties']['name']]})
-        
-    return endclasses, mdlhists
+    return run_scenlist(mdl, scenlist, nomscen, mdl.times, staged=staged, track=track, pool=pool, cstride=cstride, converge=converge, journal=journal, journal_hists=journal_hists, reuse=reuse, skip_steady=skip_steady, batch=batch, dedup=dedup, costtol=costtol)
 
-def approach(mdl, app, staged=False, track=True):
+def approach(mdl, app, staged=False, track=True, pool=False, cstride=1, converge=False, journal=False, journal_hists=True, reuse=False, skip_steady=False, batch=False, dedup=False, costtol=False):
     """
     Injects and propagates faults in the model defined by a given sample approach
 
@@ -199,8 +370,69 @@ def approach(mdl, app, staged=False, track=True):
         SampleApproach used to define the list of faults and sample time for the model.
     staged : bool, optional
         Whether to inject the fault in a copy of the nominal model at the fault time (True) or instantiate a new model for the fault (False). Setting to True roughly halves execution time. The default is False.
-    track : bool, optional
-        Whether to track states over time. The default is True.
+    track : bool or dict, optional
+        Whether to track states over time (True or False), or a dict specifying which states to track with structure
+        {'functions':{fxnname:[states]}, 'flows':{flowname:[attributes]}, 'faults':bool, 'timers':bool}, where
+        missing functions/flows are not tracked, faults are tracked by default, and timers are not. The dict may also
+        specify 'stride':int to only record every stride-th time-step and 'window':int to also record every
+        time-step within window steps of the fault times (see get_trackspec()). The default is True.
+    pool : int or function, optional
+        Number of worker processes to run the scenarios in (using a concurrent.futures.ProcessPoolExecutor), or a 
+        function returning a concurrent.futures executor to run them in given the keyword arguments initializer 
+        and initargs (e.g. functools.partial(ProcessPoolExecutor, max_workers=4)), which are used to send the model 
+        class and parameters (and run the nominal scenario) once per worker. Pool objects which are already created 
+        (e.g. a multiprocessing.Pool) are not accepted, since their workers cannot be initialized this way. At most 
+        twice as many scenarios as workers are submitted at once. The default is False, which runs the 
+        scenarios serially.
+    cstride : int, optional
+        Stride of the (sorted) scenario times to copy the nominal model at in staged execution (e.g. 10 copies the
+        model at every 10th time). Scenarios between copies are started from the nearest earlier copy by replaying
+        the nominal run up to the scenario time, trading some computation for memory. The default is 1.
+    converge : bool, optional
+        Whether to stop simulating a fault scenario when the model re-converges to the nominal scenario (i.e. when the 
+        flow values, function states, faults, and timers recorded at a time are the same as in the nominal history), 
+        filling the rest of the history with the nominal history. Requires tracking every flow value, function state, 
+        fault, and timer (see tracks_all()). Note that component states are not compared. The default is False.
+    journal : str, optional
+        Directory to save the endclass (and history) of each scenario in as it is finished (see rd.store). If the
+        directory already has saved scenarios (e.g. from a run that was stopped), they are loaded instead of being
+        run again, so the run resumes where it stopped. The default is False (no journal).
+    journal_hists : bool, optional
+        Whether to save the history of each scenario in the journal (if False, scenarios loaded from the journal
+        have empty histories). The default is True.
+    reuse : bool or str, optional
+        Whether to reset and reuse one instance of the model (per process) for each scenario if not staged (True) 
+        instead of instantiating a new model for each scenario (False). 'verify' also checks that the state of the 
+        model after Model.reset() is the same as the state of a new instance after Model.reset() (or, if staged, 
+        that the state the model is set to at the time of each scenario is the same as the state of a new instance 
+        run to that time), raising an exception if not (e.g. to check that a model can be reused, or that every 
+        attribute its behaviors keep between time-steps is a declared state or listed in _savedatts, see 
+        Model.get_state()). The default is False.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (i.e. when no state, fault, or timer 
+        changed in the last time-step), to the next time a fault is injected, a phase starts or ends, or the model 
+        is copied (recording the held states in the history in between). Only valid for models where behaviors do 
+        not depend on time except through these events. The default is False.
+    batch : int, optional
+        Number of scenarios to run at once in lockstep in a batched copy of the model, where each state is an array 
+        over the scenarios (see Model.to_batch() and exec_batch()). Only valid for models with behaviors written to 
+        work on these arrays (e.g. using has_fault_mask() and select()). Cannot be used with pool, and staged, 
+        converge, reuse, and skip_steady do not apply to batched scenarios. The default is False (each scenario is 
+        run separately).
+    dedup : bool, optional
+        Whether to reuse the results of staged scenarios that inject the same faults into the same model state within
+        a phase (which are the same up to a shift in time) instead of running each (see exec_dedup()). Requires 
+        staged=True and recording every time-step, and is only valid for models where behaviors do not depend on 
+        time except through the phases. Reused scenarios are marked with 'reused' in their endclass, and the runs 
+        saved can be summarized with tabulate.dedupsummary(). The default is False.
+    costtol : float, optional
+        Tolerance on the error in the total expected cost of the scenarios. If given, the scenarios are run in order
+        of the bound on their expected cost from Model.expcost_bound() (or of their rate, if not bounded), and the
+        run is stopped once the expected cost of the scenarios not yet run is bounded by costtol (so all are run, 
+        with a warning, if no scenario is bounded). The bound after each scenario is recorded in its endclass as 
+        'error bound' (see process.totalcost_error()), and the scenarios run are returned in their original order. 
+        In a pool, the scenarios not yet started at the stop are cancelled (so only those already running, at most 
+        twice the number of workers, are run past it). The default is False (every scenario is run, in order).
 
     Returns
     -------
@@ -209,32 +441,799 @@ def approach(mdl, app, staged=False, track=True):
     mdlhists : dict
         A dictionary with the history of all model states for each scenario (including the nominal)
     """
+    return run_scenlist(mdl, app.scenlist, app.create_nomscen(mdl), app.times, staged=staged, track=track, pool=pool, cstride=cstride, converge=converge, journal=journal, journal_hists=journal_hists, reuse=reuse, skip_steady=skip_steady, batch=batch, dedup=dedup, costtol=costtol)
+
+def iter_approach(mdl, app, staged=False, track=True, pool=False, cstride=1, converge=False, journal=False, journal_hists=True, reuse=False, skip_steady=False, batch=False, dedup=False, costtol=False):
+    """
+    Injects and propagates faults in the model defined by a given sample approach, yielding the results of each
+    scenario as it is run (so that each can be processed, saved, or discarded without holding all of them in memory).
+    Takes the same arguments as approach().
+
+    Yields
+    ------
+    scenname : str
+        Name of the scenario. The nominal scenario (named 'nominal') is yielded first.
+    endclass : dict
+        The rate, cost, and expected cost of the scenario (empty for the nominal scenario)
+    mdlhist : dict
+        The history of model states in the scenario
+    """
+    return iter_scenlist(mdl, app.scenlist, app.create_nomscen(mdl), app.times, staged=staged, track=track, pool=pool, cstride=cstride, converge=converge, journal=journal, journal_hists=journal_hists, reuse=reuse, skip_steady=skip_steady, batch=batch, dedup=dedup, costtol=costtol)
+
+def run_scenlist(mdl, scenlist, nomscen, ctimes, staged=False, track=True, pool=False, cstride=1, converge=False, journal=False, journal_hists=True, reuse=False, skip_steady=False, batch=False, dedup=False, costtol=False):
+    """
+    Runs the nominal scenario and then each scenario in a list of fault scenarios
+
+    Parameters
+    ----------
+    mdl : model
+        The model to inject faults in.
+    scenlist : list
+        List of fault scenarios to run (e.g. from list_init_faults() or app.scenlist)
+    nomscen : dict
+        The nominal scenario
+    ctimes : list
+        Times to copy the nominal model at (for staged execution)
+    staged : bool, optional
+        Whether to inject the fault in a copy of the nominal model at the fault time. The default is False.
+    track : bool or dict, optional
+        Whether to track states over time (or which states to track, see approach()). The default is True.
+    pool : int or function, optional
+        Number of worker processes or function returning an executor to run the scenarios in (see approach()). 
+        The default is False (serial execution).
+    cstride : int, optional
+        Stride of the (sorted) times in ctimes to copy the nominal model at. The default is 1.
+    converge : bool, optional
+        Whether to stop simulating each scenario when it re-converges to the nominal scenario. The default is False.
+    journal : str, optional
+        Directory to save the results of each scenario in as it is finished (and load finished scenarios from). 
+        The default is False.
+    journal_hists : bool, optional
+        Whether to save the history of each scenario in the journal. The default is True.
+    reuse : bool or str, optional
+        Whether to reset and reuse the model for each scenario if not staged (or 'verify' to also check the reset
+        or, if staged, the state of the model at the scenario time, see approach()). The default is False.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (see approach()). The default is False.
+    batch : int, optional
+        Number of scenarios to run at once in a batched copy of the model (see approach()). The default is False.
+    dedup : bool, optional
+        Whether to reuse the results of staged scenarios which are the same up to a shift in time (see approach()). 
+        The default is False.
+    costtol : float, optional
+        Tolerance on the error in the total expected cost, to stop running the scenarios at (see approach()). 
+        The default is False.
+
+    Returns
+    -------
+    endclasses : dict
+        A dictionary with the rate, cost, and expected cost of each scenario run with structure {scenname:{expected cost, cost, rate}}
+    mdlhists : dict
+        A dictionary with the history of all model states for each scenario (including the nominal)
+    """
+    endclasses = {}
+    mdlhists = {}
+    for scenname, endclass, mdlhist in iter_scenlist(mdl, scenlist, nomscen, ctimes, staged=staged, track=track, pool=pool, cstride=cstride, converge=converge, journal=journal, journal_hists=journal_hists, reuse=reuse, skip_steady=skip_steady, batch=batch, dedup=dedup, costtol=costtol):
+        if scenname!='nominal': endclasses[scenname] = endclass
+        mdlhists[scenname] = mdlhist
+    if costtol is not False: #(the scenarios run are returned in the order of scenlist rather than the order run)
+        scennames = ['nominal']+[scen['properties']['name'] for scen in scenlist]
+        endclasses = {scenname: endclasses[scenname] for scenname in scennames if scenname in endclasses}
+        mdlhists = {scenname: mdlhists[scenname] for scenname in scennames if scenname in mdlhists}
+    return endclasses, mdlhists
+
+def iter_scenlist(mdl, scenlist, nomscen, ctimes, staged=False, track=True, pool=False, cstride=1, converge=False, journal=False, journal_hists=True, reuse=False, skip_steady=False, batch=False, dedup=False, costtol=False):
+    """
+    Runs the nominal scenario and then each scenario in a list of fault scenarios, yielding the results of 
+    each scenario (in the order of scenlist, or of order_scenlist() if costtol is given) as they are run. Takes 
+    the same arguments as run_scenlist().
+
+    Yields
+    ------
+    scenname : str
+        Name of the scenario ('nominal' for the nominal scenario, which is yielded first)
+    endclass : dict
+        The rate, cost, and expected cost of the scenario (empty for the nominal scenario)
+    mdlhist : dict
+        The history of model states in the scenario
+    """
     mdl = mdl.__class__(params=mdl.params)
+    ctimes = sorted(set(ctimes))[::cstride]
+    if costtol is not False: scenlist, errorbounds = order_scenlist(mdl, scenlist)
+    if track: track = get_trackspec(mdl, track, faulttimes=[scen['properties']['time'] for scen in scenlist])
+    nomhist, nomresgraph, c_mdl = run_nominal(mdl, nomscen, track=track, staged=staged, ctimes=ctimes, skip_steady=skip_steady)
+    if journal:
+        finished = set(store.saved_scens(journal))
+        if 'nominal' not in finished: store.save_scen(journal, 'nominal', {}, nomhist if journal_hists else {})
+    else: finished = set()
+    yield 'nominal', {}, nomhist
+    results = exec_scenlist(mdl, [scen for scen in scenlist if scen['properties']['name'] not in finished], nomscen, ctimes, \
+                            nomhist, nomresgraph, c_mdl, staged=staged, track=track, pool=pool, converge=converge, reuse=reuse, skip_steady=skip_steady, batch=batch, dedup=dedup)
+    for s_ind, scen in enumerate(scenlist):
+        scenname = scen['properties']['name']
+        if scenname in finished: 
+            endclass, mdlhist = store.load_scen(journal, scenname)
+        else:
+            endclass, mdlhist = next(results)
+            if costtol is not False: endclass['error bound'] = errorbounds[s_ind]
+            if journal: store.save_scen(journal, scenname, endclass, mdlhist if journal_hists else {})
+        yield scenname, endclass, mdlhist
+        if costtol is not False and errorbounds[s_ind]<=costtol:
+            results.close()
+            break
+def order_scenlist(mdl, scenlist):
+    """
+    Orders a list of fault scenarios by the bound on their expected cost from Model.expcost_bound() (or by their 
+    rate, if not bounded), so that the scenarios which may contribute the most to the total expected cost are run 
+    first (e.g. to stop at a given error in the total expected cost, see approach()).
+
+    Parameters
+    ----------
+    mdl : model
+        The model the scenarios are run in
+    scenlist : list
+        List of fault scenarios
+
+    Returns
+    -------
+    scenlist : list
+        The ordered list of fault scenarios
+    errorbounds : list
+        Bound on the magnitude of the total expected cost of the scenarios after each scenario in scenlist (i.e. 
+        on the error in the total expected cost if the scenarios were stopped after it). Is inf while there are 
+        scenarios without a bound left.
+    """
+    bounds = [mdl.expcost_bound(scen) for scen in scenlist]
+    if scenlist and all(bound is None for bound in bounds):
+        warnings.warn("No scenario has a bound on its expected cost (see Model.expcost_bound()), so all are run")
+    bounds = [np.inf if bound is None else abs(bound) for bound in bounds]
+    order = sorted(range(len(scenlist)), key=lambda s_ind: (bounds[s_ind], scenlist[s_ind]['properties'].get('rate', 0.0)), reverse=True)
+    errorbounds = np.cumsum([bounds[s_ind] for s_ind in order[::-1]])[::-1]
+    return [scenlist[s_ind] for s_ind in order], [float(bound) for bound in errorbounds[1:]]+[0.0]
+def exec_scenlist(mdl, scenlist, nomscen, ctimes, nomhist, nomresgraph, c_mdl, staged=False, track=True, pool=False, converge=False, reuse=False, skip_steady=False, batch=False, dedup=False):
+    """
+    Runs each scenario in a list of fault scenarios (serially, in a process pool, or in batches) after the nominal 
+    scenario has been run, yielding the endclass and history of each (in the order of scenlist). Takes the arguments of 
+    run_scenlist() and the results of run_nominal().
+    """
+    if dedup:
+        if pool or batch or not staged: raise ValueError("Deduplicated scenarios must be staged (and not run in a process pool or batches)")
+        yield from exec_dedup(mdl, scenlist, nomhist, nomresgraph, c_mdl, track=track, converge=converge, skip_steady=skip_steady)
+    elif batch:
+        if pool: raise ValueError("Batched scenarios cannot be run in a process pool")
+        for b_ind in range(0, len(scenlist), batch):
+            yield from exec_batch(mdl, scenlist[b_ind:b_ind+batch], nomhist, nomresgraph, track=track)
+    elif pool:
+        setup = (mdl.__class__, mdl.params, nomscen, ctimes, staged, track, skip_steady)
+        if type(pool)==int:     executor = cf.ProcessPoolExecutor(max_workers=pool, initializer=init_worker, initargs=setup)
+        elif callable(pool):    executor = pool(initializer=init_worker, initargs=setup)
+        else: raise ValueError("pool must be a number of processes or a function returning an executor (given initializer and initargs)")
+        workers = pool if type(pool)==int else getattr(executor, '_max_workers', None) or os.cpu_count() or 1
+        with executor:
+            # (only a few more scenarios than workers are submitted at once, so results do not pile up)
+            tasks = ((scen, converge, reuse) for scen in scenlist)
+            futures = collections.deque(executor.submit(exec_scen_par, task) for task in itertools.islice(tasks, 2*workers))
+            try:
+                for scen in scenlist:
+                    endclass, mdlhist = futures.popleft().result()
+                    futures.extend(executor.submit(exec_scen_par, task) for task in itertools.islice(tasks, 1))
+                    yield endclass, join_hist(nomhist, mdlhist)
+            finally: # (if stopped early, e.g. at costtol, the scenarios not yet started are cancelled)
+                for future in futures: future.cancel()
+    else: 
+        for scen in scenlist:
+            yield exec_scen(mdl, scen, nomhist, nomresgraph, c_mdl, track=track, staged=staged, converge=converge, reuse=reuse, skip_steady=skip_steady)
+def join_hist(nomhist, splithist):
+    """ Joins a history split by split_hist() (e.g. sent back from a worker process) with the nominal history"""
+    shift, mdlhist = splithist
+    if shift is not None: mdlhist = splice_hist(nomhist, mdlhist, shift)
+    return mdlhist
+
+def run_nominal(mdl, nomscen, track=True, staged=False, ctimes=[], gtype='normal', skip_steady=False):
+    """
+    Runs the nominal scenario in the model (e.g. before running a list of fault scenarios), or returns the results
+    of the same run from the cache of nominal runs (if enabled, see cache_nominal())
+
+    Parameters
+    ----------
+    mdl : model
+        The model to run. Is reset after the run.
+    nomscen : dict
+        The nominal scenario
+    track : bool or dict, optional
+        Whether to track states over time (or which states to track, see approach()). The default is True.
+    staged : bool, optional
+        Whether to save the state of the model at the times in ctimes (for staged execution). The default is False.
+    ctimes : list, optional
+        Times to save the state of the model at. The default is [].
+    gtype : str, optional
+        The type of graph to return (normal or bipartite). The default is 'normal'.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (see approach()). The default is False.
+
+    Returns
+    -------
+    nomhist : dict
+        A dictionary with the history of model states in the nominal scenario
+    nomresgraph : networkx graph
+        Graph representation of the model at the end of the nominal scenario
+    c_mdl : dict
+        A dictionary of the states of the model (from Model.get_state()) at each time in ctimes (if staged) and at 
+        the end of the run (to classify re-converged scenarios in) with structure {time:state}
+    """
+    if not staged: ctimes=[]
+    key = nomcache_key(mdl, 'run_nominal', nomscen, track, gtype, tuple(ctimes), skip_steady)
+    results = get_nomcache(key)
+    if results: return results
+    nomhist, c_mdl, _ = prop_one_scen(mdl, nomscen, track=track, ctimes=ctimes, skip_steady=skip_steady)
+    c_mdl[np.arange(mdl.times[0], mdl.times[-1]+1, mdl.tstep)[-1]] = mdl.get_state()
+    nomresgraph = mdl.return_stategraph(gtype)
+    mdl.reset()
+    add_nomcache(key, (nomhist, nomresgraph, c_mdl), nomhist)
+    return nomhist, nomresgraph, c_mdl
+
+# cache of nominal runs (see cache_nominal()), with runs in order of use
+nomcache = {'maxsize':0, 'maxmem':None, 'runs':collections.OrderedDict(), 'nbytes':{}}
+def cache_nominal(maxsize=8, maxmem=None):
+    """
+    Enables (or disables) caching the results of nominal runs (i.e. the nominal history, state graph, and staged
+    states of the model) in nominal(), one_fault(), single_faults(), approach(), and iter_approach(), so that 
+    repeated calls on the same model do not have to re-run the nominal scenario. Runs are cached by model class, 
+    model parameters, times, and time-step (along with the tracking options and staged copy times of the run), 
+    and the least recently used runs are evicted when the cache is full. Note that cached results are shared 
+    between calls, so the nominal results returned should not be modified.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of nominal runs to cache (0 disables the cache). The default is 8.
+    maxmem : int, optional
+        Maximum total size (in bytes) of the histories in the cache. The default is None (no limit).
+    """
+    nomcache['maxsize'], nomcache['maxmem'] = maxsize, maxmem
+    add_nomcache(None, None, {})
+def clear_nomcache():
+    """ Clears the cache of nominal runs (see cache_nominal())"""
+    nomcache['runs'].clear()
+    nomcache['nbytes'].clear()
+def nomcache_key(mdl, *args):
+    """ Returns the key of a nominal run of the model mdl in the cache of nominal runs given the arguments of the
+    run args (the nominal scenario, track specification, etc.)"""
+    #(for track specifications, the steps recorded are compared rather than the fault times they are recorded around)
+    args = tuple(({k:v for k, v in arg.items() if k not in ['stride', 'window', 'faulttimes']}, get_recinds(mdl, arg)) \
+                 if type(arg)==dict and 'faulttimes' in arg else arg for arg in args)
+    return (mdl.__class__, hashable(getattr(mdl, 'params', {})), tuple(mdl.times), mdl.tstep) + hashable(args)
+def get_nomcache(key):
+    """ Returns the results of the nominal run with the given key from the cache of nominal runs (or None)"""
+    if key not in nomcache['runs']: return None
+    nomcache['runs'].move_to_end(key)
+    return nomcache['runs'][key]
+def add_nomcache(key, results, nomhist):
+    """ Adds the results of a nominal run with history nomhist to the cache of nominal runs (if enabled), 
+    evicting the least recently used runs if the cache exceeds its maximum size or memory"""
+    runs, nbytes = nomcache['runs'], nomcache['nbytes']
+    if key is not None and nomcache['maxsize']:
+        runs[key], nbytes[key] = results, hist_nbytes(nomhist)
+    while len(runs)>nomcache['maxsize'] or (nomcache['maxmem'] is not None and runs and sum(nbytes.values())>nomcache['maxmem']):
+        oldkey, _ = runs.popitem(last=False)
+        nbytes.pop(oldkey)
+def hist_nbytes(hist):
+    """ Returns the number of bytes in the arrays of a (nested) history"""
+    if isinstance(hist, dict):  return sum(hist_nbytes(val) for val in hist.values())
+    return getattr(hist, 'nbytes', 0)
+def hashable(params):
+    """ Converts a (nested) structure of parameters (dicts, lists, arrays, etc) into a hashable structure of tuples"""
+    if isinstance(params, dict):        return tuple((key, hashable(val)) for key, val in sorted(params.items(), key=lambda item: repr(item[0])))
+    elif isinstance(params, (list, tuple, set)):
+        if isinstance(params, set):     params = sorted(params, key=repr)
+        return tuple(hashable(val) for val in params)
+    elif isinstance(params, np.ndarray): return (params.dtype.str, params.shape, params.tobytes())
+    try:
+        hash(params)
+        return params
+    except TypeError:                   return repr(params)
+
+def exec_scen(mdl, scen, nomhist, nomresgraph, c_mdl, track=True, staged=False, converge=False, reuse=False, skip_steady=False):
+    """
+    Runs a single fault scenario and classifies the result against the nominal run
+
+    Parameters
+    ----------
+    mdl : model
+        The model to inject faults in (set to the nominal state at the scenario time if staged, or a new instance is created if not).
+    scen : dict
+        The fault scenario to run
+    nomhist : dict
+        The history of model states in the nominal scenario
+    nomresgraph : networkx graph
+        Graph representation of the model at the end of the nominal scenario
+    c_mdl : dict
+        States of the nominal model at (or before) the scenario times (for staged execution)
+    track : bool or dict, optional
+        Whether to track states over time (or which states to track, see approach()). The default is True.
+    staged : bool, optional
+        Whether to inject the fault in a copy of the nominal model at the fault time. The default is False.
+    converge : bool, optional
+        Whether to stop simulating the scenario when it re-converges to the nominal scenario. The default is False.
+    reuse : bool or str, optional
+        Whether to reset and reuse the model if not staged (see init_scen_mdl()), or 'verify' to check the reset 
+        (or, if staged, the state of the model at the scenario time, see set_staged()). The default is False.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (see approach()). The default is False.
+
+    Returns
+    -------
+    endclass : dict
+        The rate, cost, and expected cost of the scenario
+    mdlhist : dict
+        A dictionary with the history of model states in the scenario
+    """
     if staged:
-        nomhist, c_mdl = prop_one_scen(mdl, app.create_nomscen(mdl), track=track, ctimes=app.times)
+        set_staged(mdl, c_mdl, scen['properties']['time'], verify=reuse=='verify')
+        mdlhist, _, t_conv =prop_one_scen(mdl, scen, track=track, staged=True, prevhist=nomhist, converge=converge, skip_steady=skip_steady)
     else:
-        nomhist, c_mdl = prop_one_scen(mdl, app.create_nomscen(mdl), track=track)
-    nomresgraph = mdl.return_stategraph()
-    mdl.reset()
+        mdl = init_scen_mdl(mdl, reuse)
+        mdlhist, _, t_conv =prop_one_scen(mdl, scen, track=track, prevhist=nomhist, converge=converge, skip_steady=skip_steady)
+    if t_conv is not None: mdl.set_state(c_mdl[max(c_mdl)]) #if the scenario re-converged, it ends in the nominal state
+    return classify_scen(mdl, scen, mdlhist, nomhist, nomresgraph), mdlhist
+def classify_scen(mdl, scen, mdlhist, nomhist, nomresgraph):
+    """ Classifies the result of a fault scenario run in the model mdl (with history mdlhist) against the nominal 
+    run, returning its endclass (with the loops in its propagation, if any)"""
+    endfaults, endfaultprops = mdl.return_faultmodes()
+    resgraph = mdl.return_stategraph()
     
-    endclasses = {}
-    mdlhists = {}
-    mdlhists['nominal'] = nomhist
-    for i, scen in enumerate(app.scenlist):
-        #run model with fault scenario
-        if staged:
-            mdl=c_mdl[scen['properties']['time']].copy()
-            mdlhists[scen['properties']['name']], _ =prop_one_scen(mdl, scen, track=track, staged=True, prevhist=nomhist)
+    endflows = proc.graphflows(resgraph, nomresgraph) #TODO: supercede this with something in faultprop?
+    endclass = mdl.find_classification(resgraph, endfaultprops, endflows, scen, {'nominal':nomhist, 'faulty':mdlhist})
+    if scen_loops(mdl, scen): endclass['loops'] = scen_loops(mdl, scen)
+    return endclass
+
+def exec_dedup(mdl, scenlist, nomhist, nomresgraph, c_mdl, track=True, converge=False, skip_steady=False):
+    """
+    Runs each scenario in a list of (staged) fault scenarios, reusing the results of scenarios that inject the same 
+    faults into the same model state (relative to the scenario time) within the same phase. Since these scenarios 
+    are the same up to a shift in time, only the earliest in each group is run, and the others reuse its history 
+    (shifted to their time) up to the end of the phase, after which they are run from the shifted state of the 
+    earliest scenario. This assumes that the behaviors of the model only depend on time through the phases (as 
+    with skip_steady). Reused scenarios are marked in their endclass with 'reused':{'scenario':name of the reused 
+    scenario, 'shift':time shift, 'steps saved':number of time-steps not run, 'runs saved':fraction of the run 
+    not run} (see also tabulate.dedupsummary()).
+
+    Parameters
+    ----------
+    mdl : model
+        The (nominal) model to inject faults in
+    scenlist : list
+        The fault scenarios to run
+    nomhist : dict
+        The history of model states in the nominal scenario
+    nomresgraph : networkx graph
+        Graph representation of the model at the end of the nominal scenario
+    c_mdl : dict
+        States of the nominal model at (or before) the scenario times (for staged execution)
+    track : bool or dict, optional
+        Whether to track states over time (or which states to track, see approach()). Every time-step must be 
+        recorded (i.e. stride=1). The default is True.
+    converge : bool, optional
+        Whether to stop simulating scenarios which are not reused when they re-converge to the nominal scenario. The default is False.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (see approach()). The default is False.
+
+    Yields
+    ------
+    endclass : dict
+        The rate, cost, and expected cost of each scenario (in the order of scenlist)
+    mdlhist : dict
+        The history of model states in each scenario
+    """
+    if track and get_trackspec(mdl, track)['stride']!=1: raise ValueError("Scenarios can only be deduplicated if every time-step is recorded (stride=1)")
+    events = sorted({t for phase in mdl.phases.values() for t in phase})
+    groups = {}
+    for s_ind, scen in enumerate(scenlist):
+        time = scen['properties']['time']
+        if time in c_mdl:   state = c_mdl[time]
+        else:               
+            set_staged(mdl, c_mdl, time)
+            state = mdl.get_state()
+        key = hashable((shift_state(state, -time), scen['faults'], bisect.bisect_right(events, time)))
+        groups.setdefault(key, []).append(s_ind)
+    #the earliest scenario of each group is run (saving its states at the times the others reuse up to)
+    reused, ctimes = {}, {}
+    for s_inds in groups.values():
+        first = min(s_inds, key=lambda s_ind: scenlist[s_ind]['properties']['time'])
+        for s_ind in s_inds:
+            if s_ind==first: continue
+            reused[s_ind] = first
+            shift = scenlist[s_ind]['properties']['time']-scenlist[first]['properties']['time']
+            ctimes.setdefault(first, set()).add(reuse_times(mdl, events, scenlist[s_ind]['properties']['time'])[0]-shift)
+    runs, remaining = {}, collections.Counter(reused.values())
+    for s_ind, scen in enumerate(scenlist):
+        first = reused.get(s_ind, s_ind)
+        if first in ctimes and first not in runs:
+            set_staged(mdl, c_mdl, scenlist[first]['properties']['time'])
+            mdlhist, c_first, _ = prop_one_scen(mdl, scenlist[first], track=track, staged=True, ctimes=sorted(ctimes[first]), prevhist=nomhist, skip_steady=skip_steady)
+            runs[first] = (classify_scen(mdl, scenlist[first], mdlhist, nomhist, nomresgraph), mdlhist, c_first, mdl.loops)
+        if s_ind not in reused and s_ind not in runs:
+            yield exec_scen(mdl, scen, nomhist, nomresgraph, c_mdl, track=track, staged=True, converge=converge, skip_steady=skip_steady)
+            continue
+        remaining[first] -= 1
+        if s_ind not in reused: result = runs[s_ind][:2]
         else:
-            mdl = mdl.__class__(params=mdl.params)
-            mdlhists[scen['properties']['name']], _ =prop_one_scen(mdl, scen, track=track)
+            _, firsthist, c_first, firstloops = runs[first]
+            time, shift = scen['properties']['time'], scen['properties']['time']-scenlist[first]['properties']['time']
+            lasttime, conttime = reuse_times(mdl, events, time)
+            mdl.set_state(shift_state(c_first[lasttime-shift], shift))
+            t_ind, steps = int(round((time-mdl.times[0])/mdl.tstep)), int(round((lasttime-time)/mdl.tstep))+1
+            if track:
+                mdlhist = shift_hist(nomhist, firsthist, t_ind, t_ind-int(round(shift/mdl.tstep)), steps)
+                mdlhist['time'] = nomhist['time'].copy()
+            else: mdlhist = {}
+            loops = [{**loop, 'time':loop['time']+shift} for loop in firstloops if loop['time']+shift<=lasttime]
+            if conttime is None: mdl.loops = loops
+            else:
+                mdlhist, _, _ = prop_one_scen(mdl, {'faults':{}, 'properties':{'time':conttime}}, track=track, staged=True, prevhist=mdlhist, skip_steady=skip_steady)
+                mdl.loops = loops + mdl.loops
+            endclass = classify_scen(mdl, scen, mdlhist, nomhist, nomresgraph)
+            totalsteps = int(round((mdl.times[-1]-time)/mdl.tstep))+1
+            endclass['reused'] = {'scenario':scenlist[first]['properties']['name'], 'shift':shift, 'steps saved':steps, 'runs saved':steps/totalsteps}
+            result = endclass, mdlhist
+        if remaining[first]<0: runs.pop(first) #(once all of the scenarios in the group are finished)
+        yield result
+def reuse_times(mdl, events, time):
+    """ Returns the last time (lasttime) a scenario at time can reuse the (shifted) results of an earlier scenario 
+    up to (the end of the phase or the model time range), and the time to run the scenario from after 
+    (conttime, or None if the phase ends after the model time range)"""
+    nextevents = [t for t in events if t>time]
+    if nextevents and nextevents[0]<=mdl.times[-1]:  return nextevents[0]-mdl.tstep, nextevents[0]
+    else:                                           return mdl.times[-1], None
+def shift_state(state, shift):
+    """ Returns a copy of a model state (from Model.get_state()) with the times of the functions (and their 
+    components) shifted by shift"""
+    shifted = lambda blockstate: {**blockstate, 'time': None if blockstate['time'] is None else blockstate['time']+shift}
+    return {'flows': state['flows'], 'fxns': {fxnname: {**shifted(fxnstate), 'components': {compname: shifted(compstate) \
+            for compname, compstate in fxnstate['components'].items()}} for fxnname, fxnstate in state['fxns'].items()}}
+def shift_hist(prevhist, hist, t_ind, s_ind, steps):
+    """ Returns a copy of the history prevhist with the values for the steps time-steps from index t_ind replaced
+    by the values in hist from index s_ind (i.e. shifting the history hist by t_ind-s_ind)"""
+    if isinstance(hist, dict):          return {key: shift_hist(prevhist[key], val, t_ind, s_ind, steps) for key, val in hist.items()}
+    elif isinstance(hist, np.ndarray):  
+        vals = np.array(prevhist)
+        vals[t_ind:t_ind+steps] = hist[s_ind:s_ind+steps]
+        return vals
+    elif type(hist)==list:              return prevhist[:t_ind]+hist[s_ind:s_ind+steps]+prevhist[t_ind+steps:]
+    else:                               return hist
+
+def init_scen_mdl(mdl, reuse=False):
+    """
+    Returns a model in its initial state to run a (non-staged) scenario in: either a new instance of the model, or 
+    (if reuse) the same model after Model.reset(), with its states then set to the states of a new instance (see 
+    Model.get_state(), taken once per model). If reuse=='verify', the states of the flows, functions, components, 
+    and timers (see mdl_diffs()) in the model after reset() are first checked against a new instance after reset(),
+    and an exception is raised if any differ.
+    """
+    if not reuse: return mdl.__class__(params=mdl.params)
+    if not hasattr(mdl, '_initstate'): mdl._initstate = mdl.__class__(params=mdl.params).get_state()
+    mdl.reset()
+    if reuse=='verify':
+        newmdl = mdl.__class__(params=mdl.params)
+        newmdl.reset()
+        diffs = mdl_diffs(mdl, newmdl)
+        if diffs: raise Exception("Model not returned to its initial state by reset(): "+", ".join(diffs))
+    mdl.set_state(mdl._initstate)
+    return mdl
+def mdl_diffs(mdl, newmdl):
+    """ Returns a list of the states in the model mdl that differ from the model newmdl, i.e. the values saved by 
+    Model.get_state(): the declared attributes of the flows, the declared states and faults of the functions and 
+    components (and their times, if timely), the times of the timers, and any attributes listed in _savedatts"""
+    state, newstate = mdl.get_state(), newmdl.get_state()
+    diffs = []
+    for flowname, flowstate in state['flows'].items():
+        diffs.extend(state_diffs(flowstate, newstate['flows'][flowname], flowname))
+    for fxnname, fxn in mdl.fxns.items():
+        diffs.extend(block_diffs(fxn, state['fxns'][fxnname], newstate['fxns'][fxnname], fxnname))
+    return diffs
+def block_diffs(block, blockstate, newblockstate, name):
+    """ Returns a list of the states of a function or component block (in blockstate, from get_state()) which differ 
+    from newblockstate"""
+    flatten = lambda bstate: {**bstate['states'], **bstate['atts'], **bstate.get('timers', {}), 'faults': bstate['faults'], \
+                              **({'time': bstate['time']} if block.timely else {})}
+    diffs = state_diffs(flatten(blockstate), flatten(newblockstate), name)
+    for compname, comp in getattr(block, 'components', {}).items():
+        diffs.extend(block_diffs(comp, blockstate['components'][compname], newblockstate['components'][compname], name+'.'+compname))
+    return diffs
+def state_diffs(state, newstate, name):
+    """ Returns a list of the values in the dict state that differ from newstate"""
+    diffs = []
+    for att, val in state.items():
+        newval = newstate.get(att)
+        try:
+            if val is newval or np.all(val==newval): continue
+        except ValueError: pass
+        diffs.append(name+'.'+att+' ('+str(val)+' != '+str(newval)+')')
+    return diffs
+def set_staged(mdl, c_mdl, time, verify=False):
+    """
+    Sets the model to its state in the nominal run at a given time using the states saved in the nominal run, 
+    replaying the nominal run from the nearest earlier saved state if the state was not saved at that time.
+    Since only the declared states (and attributes in _savedatts) are saved (see Model.get_state()), other 
+    attributes changed in the behaviors of the model carry over from the previous scenario run in it, which can be
+    checked with verify if they change the states of the model.
+
+    Parameters
+    ----------
+    mdl : model
+        The model to set the state of (an instance of the nominal model)
+    c_mdl : dict
+        A dictionary of the states of the model in the nominal run (from Model.get_state()) with structure {time:state}
+    time : float
+        Time to set the model to the state at
+    verify : bool, optional
+        Whether to check that the states of the flows, functions, components, and timers in the model (see 
+        mdl_diffs()) are the same as in a new instance run to the given time, raising an exception if any differ. 
+        The default is False.
+    """
+    ctime = max([t for t in c_mdl if t<=time])
+    mdl.set_state(c_mdl[ctime])
+    flowstates={}
+    for t in np.arange(mdl.times[0], mdl.times[-1]+1, mdl.tstep):
+        if ctime<t<=time: flowstates = propagate(mdl, [], t, flowstates)
+    if verify:
+        newmdl, flowstates = mdl.__class__(params=mdl.params), {}
+        for t in np.arange(mdl.times[0], mdl.times[-1]+1, mdl.tstep):
+            if t<=time: flowstates = propagate(newmdl, [], t, flowstates)
+        diffs = mdl_diffs(mdl, newmdl)
+        if diffs: raise Exception("Model not set to its nominal state at t="+str(time)+" (undeclared states?): "+", ".join(diffs))
+
+# state of the nominal run in each worker process (for parallel execution)
+worker = {}
+def init_worker(mdlclass, params, nomscen, ctimes, staged, track, skip_steady):
+    """ Instantiates the model and runs the nominal scenario in a worker process (once per worker, as the 
+    initializer of the pool) """
+    mdl = mdlclass(params=params)
+    nomhist, nomresgraph, c_mdl = run_nominal(mdl, nomscen, track=track, staged=staged, ctimes=ctimes, skip_steady=skip_steady)
+    worker.clear()
+    worker.update({'staged':staged, 'track':track, 'skip_steady':skip_steady, 'mdl':mdl, \
+                   'nomhist':nomhist, 'nomresgraph':nomresgraph, 'c_mdl':c_mdl})
+def exec_scen_par(args):
+    """ Runs a fault scenario in a worker process (set up by init_worker()). args is a tuple (scen, converge, reuse)"""
+    scen, converge, reuse = args
+    endclass, mdlhist = exec_scen(worker['mdl'], scen, worker['nomhist'], worker['nomresgraph'], worker['c_mdl'], track=worker['track'], \
+                                  staged=worker['staged'], converge=converge, reuse=reuse, skip_steady=worker['skip_steady'])
+    return endclass, split_hist(mdlhist) # (only the part of the history not shared with the nominal is sent back)
+
+def exec_batch(mdl, scenlist, nomhist, nomresgraph, track=True):
+    """
+    Runs a batch of fault scenarios in lockstep in a batched instance of the model (see Model.to_batch()), where
+    each function is updated in each scenario at the same points in propagation as it would be in prop_one_scen(),
+    and classifies the result of each scenario against the nominal run. The behaviors of the functions in the model
+    must be written to work on arrays of states over the batch (e.g., using has_fault_mask() and select()).
+
+    Parameters
+    ----------
+    mdl : model
+        The model to inject faults in
+    scenlist : list
+        The fault scenarios to run in the batch
+    nomhist : dict
+        The history of model states in the nominal scenario
+    nomresgraph : networkx graph
+        Graph representation of the model at the end of the nominal scenario
+    track : bool or dict, optional
+        Whether to track states over time (or which states to track, see approach()). The default is True.
+
+    Returns
+    -------
+    results : list
+        List of the (endclass, mdlhist) of each scenario in scenlist
+    """
+    bmdl = mdl.__class__(params=mdl.params)
+    timerange = np.arange(bmdl.times[0], bmdl.times[-1]+1, bmdl.tstep)
+    if track:
+        trackspec = get_trackspec(bmdl, track)
+        steps = get_recinds(bmdl, trackspec)
+        recinds = {step: r_ind for r_ind, step in enumerate(steps)}
+        mdlhist = init_mdlhist(bmdl, timerange[steps], trackspec)
+    bmdl.to_batch(len(scenlist))
+    if track: bindings = bind_batchhist(bmdl, mdlhist, len(scenlist))
+    #faults to inject with structure {time:{fxnname:{fault:mask of scenarios}}}
+    injections = {}
+    for s_ind, scen in enumerate(scenlist):
+        for fxnname, faults in scen['faults'].items():
+            for fault in (faults if type(faults)==list else [faults]):
+                faultmasks = injections.setdefault(scen['properties']['time'], {}).setdefault(fxnname, {})
+                faultmasks.setdefault(fault, np.zeros(len(scenlist), dtype=bool))[s_ind] = True
+    flowstates = {}
+    for flowname, flow in bmdl.flows.items():
+        flowstates[flowname] = batch_status(flow)
+        flow._changed=False
+    loops = [[] for scen in scenlist]
+    for t_ind, t in enumerate(timerange):
+        prop_batch(bmdl, injections.get(t, {}), t, flowstates, loops)
+        if track and t_ind in recinds: record_batchhist(bindings, recinds[t_ind])
+    #each scenario is classified using a (non-batched) model set to its state at the end of the batch
+    results = []
+    for s_ind, scen in enumerate(scenlist):
+        mdl.set_state(bmdl.get_batch_state(s_ind))
+        mdl.loops = loops[s_ind]
+        scenhist = split_batchhist(mdlhist, s_ind) if track else {}
         endfaults, endfaultprops = mdl.return_faultmodes()
         resgraph = mdl.return_stategraph()
-        
-        endflows = proc.graphflows(resgraph, nomresgraph) #TODO: supercede this with something in faultprop?
-        endclasses[scen['properties']['name']] = mdl.find_classification(resgraph, endfaultprops, endflows, scen, {'nominal':nomhist, 'faulty':mdlhists[scen['properties']['name']]})
-        
-    return endclasses, mdlhists
+        endflows = proc.graphflows(resgraph, nomresgraph)
+        endclass = mdl.find_classification(resgraph, endfaultprops, endflows, scen, {'nominal':nomhist, 'faulty':scenhist})
+        if scen_loops(mdl, scen): endclass['loops'] = scen_loops(mdl, scen)
+        results.append((endclass, scenhist))
+    mdl.reset()
+    return results
+def prop_batch(mdl, injections, time, flowstates, loops):
+    """
+    Injects and propagates faults through a batched model at one time-step (the equivalent of propagate())
+
+    Parameters
+    ----------
+    mdl : model
+        Batched model (see Model.to_batch())
+    injections : dict
+        Faults to inject with structure {fxnname:{fault:mask}}, where mask marks the scenarios to inject the fault in
+    time : float
+        The current time-step
+    flowstates : dict
+        States of the flows at the previous time-step (see batch_status()), which are updated in place
+    loops : list
+        Lists of the loops detected in propagation in each scenario (see loop_event()), which are added to
+    """
+    size = len(loops)
+    injmasks = {fxnname: np.any(list(faultmasks.values()), axis=0) for fxnname, faultmasks in injections.items()}
+    if injections:
+        injrows = np.any(list(injmasks.values()), axis=0)
+        prop_batch_time(mdl, {fxnname: injrows.copy() for fxnname in mdl.timelyfxns}, flowstates, time, loops)
+        for fxnname, faultmasks in injections.items():
+            update_batch_fxn(mdl, fxnname, injmasks[fxnname], time, faults=faultmasks)
+    activefxns = {fxnname: np.ones(size, dtype=bool) for fxnname in mdl.timelyfxns}
+    for fxnname, mask in injmasks.items(): activefxns[fxnname] = activefxns.get(fxnname, False) | mask
+    prop_batch_time(mdl, activefxns, flowstates, time, loops)
+def prop_batch_time(mdl, activefxns, flowstates, time, loops):
+    """
+    Propagates faults through a batched model (the equivalent of prop_time(), with the sets of active functions, 
+    changes in flows, etc. kept separately for each scenario as masks over the batch)
+
+    Parameters
+    ----------
+    mdl : model
+        Batched model (see Model.to_batch())
+    activefxns : dict
+        Functions to update with structure {fxnname:mask}, where mask marks the scenarios the function is active in
+    flowstates : dict
+        States of the flows (see batch_status()), which are updated in place
+    time : float
+        The current time-step
+    loops : list
+        Lists of the loops detected in propagation in each scenario (see loop_event()), which are added to
+    """
+    size, order = len(loops), mdl.fxnorder
+    n, looped, statekeys = 0, [[] for loop in loops], [{} for loop in loops]
+    #flows may have been set outside of propagation (e.g. between time-steps), so all are checked at first
+    for flowname, flow in mdl.flows.items():
+        if flow._changed:
+            changedrows = batch_diff(flowstates, flowname, flow)
+            for nextfxn in mdl.flowreaders[flowname]: activefxns[nextfxn] = activefxns.get(nextfxn, False) | changedrows
+    while activefxns:
+        queue = [(order[fxnname], fxnname) for fxnname in activefxns]
+        heapq.heapify(queue)
+        nextfxns, updated, changed = {}, {}, {}
+        while queue:
+            fxnind, fxnname = heapq.heappop(queue)
+            rows = activefxns[fxnname]
+            if not rows.any(): continue
+            staterows = update_batch_fxn(mdl, fxnname, rows, time)
+            if staterows.any(): nextfxns[fxnname] = nextfxns.get(fxnname, False) | staterows
+            updated[fxnname] = np.where(rows, len(updated), updated.get(fxnname, -1))
+            for flowname in mdl.fxnneighbors[fxnname]:
+                if mdl.flows[flowname]._changed:
+                    prevstate = flowstates[flowname]
+                    changedrows = batch_diff(flowstates, flowname, mdl.flows[flowname])
+                    if changedrows.any():
+                        prevstate, changeinds = changed.get(flowname, (prevstate, np.full(size, -1)))
+                        changed[flowname] = (prevstate, np.where(changedrows, len(updated)-1, changeinds))
+                        for nextfxn in mdl.flowreaders[flowname]:
+                            if order[nextfxn]>fxnind:
+                                if nextfxn not in activefxns: heapq.heappush(queue, (order[nextfxn], nextfxn))
+                                activefxns[nextfxn] = activefxns.get(nextfxn, False) | changedrows
+        for flowname, (prevstate, changeinds) in changed.items():
+            changedrows = np.any([prevstate[att]!=vals for att, vals in flowstates[flowname].items()], axis=0)
+            for nextfxn in mdl.flowreaders[flowname]:
+                wakerows = changedrows & (updated.get(nextfxn, -1)<=changeinds)
+                if wakerows.any(): nextfxns[nextfxn] = nextfxns.get(nextfxn, False) | wakerows
+        activefxns = nextfxns
+        n+=1
+        #loops are checked (and stopped) separately in each scenario, as in prop_time()
+        activerows = np.any(list(activefxns.values()), axis=0) if activefxns else np.zeros(size, dtype=bool)
+        for s_ind in np.flatnonzero(activerows):
+            active = {fxnname for fxnname, rows in activefxns.items() if rows[s_ind]}
+            loop = None
+            if n>=len(mdl.fxns):
+                state = batch_row_state(mdl, flowstates, s_ind)
+                statekey = hashable((active, *state))
+                looped[s_ind].append(state)
+                if statekey in statekeys[s_ind]:   loop = loop_event(time, 'cycle', n, active, looped[s_ind][statekeys[s_ind][statekey]:])
+                else:                               statekeys[s_ind][statekey] = len(looped[s_ind])-1
+            if not loop and n>=mdl.maxiter:         loop = loop_event(time, 'maxiter', n, active, looped[s_ind])
+            if loop:
+                loops[s_ind].append(loop)
+                for rows in activefxns.values(): rows[s_ind] = False
+        activefxns = {fxnname: rows for fxnname, rows in activefxns.items() if rows.any()}
+def update_batch_fxn(mdl, fxnname, rows, time, faults={}):
+    """ Updates the function fxnname in a batched model in the scenarios marked by the mask rows (by updating it in
+    all scenarios and restoring the flows and states of the others), injecting the faults given with structure 
+    {fault:mask} (or 'nom', as in FxnBlock.updatefxn()), and returns the mask of the scenarios where the 
+    states or faults of the function changed"""
+    fxn = mdl.fxns[fxnname]
+    size = len(rows)
+    oldflows = {flowname: {att: np.array(getattr(mdl.flows[flowname], att)) for att in mdl.flows[flowname]._attributes} \
+                for flowname in mdl.fxnneighbors[fxnname]}
+    oldstates = {state: getattr(fxn, state).copy() for state in fxn._states}
+    oldtimers = {timername: getattr(fxn, timername).time for timername in fxn.timers}
+    oldfaults, oldtime = fxn.faultmask.copy(), getattr(fxn, 'time', None)
+    for fault, mask in (faults or {'nom':rows}).items(): fxn.add_fault_mask(fault, mask & rows)
+    fxn.updatefxn(time=time)
+    allrows = rows.all()
+    for flowname, oldflow in oldflows.items():
+        flow = mdl.flows[flowname]
+        for att, oldvals in oldflow.items():
+            vals = getattr(flow, att)
+            if not allrows:             setattr(flow, att, np.where(rows, vals, oldvals))
+            elif np.ndim(vals)==0:      setattr(flow, att, np.full(size, vals))
+    staterows = np.zeros(size, dtype=bool)
+    for state, oldvals in oldstates.items():
+        vals = getattr(fxn, state)
+        if not allrows or np.ndim(vals)==0: setattr(fxn, state, np.where(rows, vals, oldvals))
+        staterows |= getattr(fxn, state)!=oldvals
+    for timername, oldtime in oldtimers.items():
+        timer = getattr(fxn, timername)
+        if not allrows or np.ndim(timer.time)==0: timer.time = np.where(rows, timer.time, oldtime)
+    if not allrows: fxn.faultmask[~rows] = oldfaults[~rows]
+    if oldtime is not None: fxn.time = np.where(rows, fxn.time, oldtime)
+    return staterows | np.any(fxn.faultmask!=oldfaults, axis=1)
+def batch_status(flow):
+    """ Returns the status of a flow in a batched model (see Flow.status()) with structure {attribute:array}"""
+    return {att: np.array(val) for att, val in flow.status().items()}
+def batch_diff(flowstates, flowname, flow):
+    """ Returns a mask of the scenarios in a batch where the status of the flow flowname differs from that in 
+    flowstates (updating flowstates with the current status and clearing the flow's changed flag)"""
+    flowstate = batch_status(flow)
+    changedrows = np.any([flowstates[flowname][att]!=vals for att, vals in flowstate.items()], axis=0)
+    flowstates[flowname] = flowstate
+    flow._changed = False
+    return changedrows
+def batch_row_state(mdl, flowstates, s_ind):
+    """ Returns the (flowstates, fxnstates) of scenario s_ind of a batched model in the format used by prop_time() 
+    to detect loops"""
+    flowstate = {flowname: {att: vals[s_ind].item() for att, vals in atts.items()} for flowname, atts in flowstates.items()}
+    fxnstates = {}
+    for fxnname, fxn in mdl.fxns.items():
+        fxnstate = fxn.get_batch_state(s_ind)
+        fxnstates[fxnname] = (fxnstate['states'], fxnstate['faults'])
+    return flowstate, fxnstates
+def bind_batchhist(mdl, mdlhist, size):
+    """ Binds the history of a batched model to the states it records (see bind_mdlhist()), replacing each array 
+    in mdlhist with an array of shape (times, size) with the history of each scenario in its columns"""
+    for hist in [*mdlhist["flows"].values(), *mdlhist["functions"].values(), *mdlhist["timers"].values()]:
+        for key, vals in hist.items(): hist[key] = np.repeat(vals[:, None], size, axis=1)
+    attbindings, statusbindings, faultbindings = bind_mdlhist(mdl, mdlhist)
+    return attbindings, statusbindings, [(fxn, hist) for fxn, fxnname, hist, faultmodes in faultbindings]
+def record_batchhist(bindings, t_ind):
+    """ Records the states of a batched model at t_ind in its history (using the bindings from bind_batchhist()),
+    encoding the faults in each scenario as a bitmask (see encode_faults())"""
+    attbindings, statusbindings, faultbindings = bindings
+    for obj, att, hist, _ in attbindings:  hist[t_ind] = getattr(obj, att)
+    for flow, hists, _ in statusbindings:
+        status = flow.status()
+        for att, hist in hists.items(): hist[t_ind] = status[att]
+    for fxn, hist in faultbindings:
+        hist[t_ind] = np.sum(fxn.faultmask.astype(np.uint64) << np.arange(fxn.faultmask.shape[1], dtype=np.uint64), axis=1, dtype=np.uint64)
+def split_batchhist(batchhist, s_ind):
+    """ Returns the history of scenario s_ind from the history of a batched model"""
+    if isinstance(batchhist, dict): return {key: split_batchhist(val, s_ind) for key, val in batchhist.items()}
+    elif isinstance(batchhist, np.ndarray) and batchhist.ndim==2: return batchhist[:, s_ind].copy()
+    else: return copy.copy(batchhist)
 
 def construct_nomscen(mdl):
     """
@@ -290,7 +1289,7 @@ def list_init_faults(mdl):
                 faultlist.append(newscen)
     return faultlist
        
-def prop_one_scen(mdl, scen, track=True, staged=False, ctimes=[], prevhist={}):
+def prop_one_scen(mdl, scen, track=True, staged=False, ctimes=[], prevhist={}, converge=False, skip_steady=False):
     """
     Runs a fault scenario in the model over time
 
@@ -300,50 +1299,192 @@ def prop_one_scen(mdl, scen, track=True, staged=False, ctimes=[], prevhist={}):
         The model to inject faults in.
     scen : Dict
         The fault scenario to run. Has structure: {'faults':{fxn:fault}, 'properties':{rate, time, name, etc}}
-    track : bool, optional
-        Whether to track states over time. The default is True.
+    track : bool or dict, optional
+        Whether to track states over time (or which states to track, see approach()). The default is True.
     staged : bool, optional
         Whether to inject the fault in a copy of the nominal model at the fault time (True) or instantiate a new model for the fault (False). Setting to True roughly halves execution time. The default is False.
     ctimes : list, optional
-        List of times to copy the model (for use in staged execution). The default is [].
+        List of times to save the state of the model at (for use in staged execution). The default is [].
     prevhist : dict, optional
-        The previous results hist (for used in staged execution). The default is {}.
+        The previous results hist (for used in staged execution and convergence checking). The default is {}.
+    converge : bool, optional
+        Whether to stop simulating the scenario when it re-converges to prevhist (see converged()). The default is False.
+    skip_steady : bool, optional
+        Whether to skip ahead in time when the model is in a steady state (see approach()). The default is False.
 
     Returns
     -------
     mdlhist : dict
         A dictionary with a history of modelstates.
     c_mdl : dict
-        A dictionary of models at each time given in ctimes with structure {time:model}
+        A dictionary of the states of the model (from Model.get_state()) at each time given in ctimes with structure {time:state}
+    t_conv : float
+        Time the scenario re-converged to prevhist at (None if it did not or converge=False)
     """
     #if staged, we want it to start a new run from the starting time of the scenario,
     # using a copy of the input model (which is the nominal run) at this time
     if staged:
         timerange=np.arange(scen['properties']['time'], mdl.times[-1]+1, mdl.tstep)
-        shift = len(np.arange(mdl.times[0], scen['properties']['time'], mdl.tstep))
-        if track: 
-            if prevhist:    mdlhist = copy.deepcopy(prevhist)
-            else:           mdlhist = init_mdlhist(mdl, timerange)
+        stepshift = len(np.arange(mdl.times[0], scen['properties']['time'], mdl.tstep))
     else: 
         timerange = np.arange(mdl.times[0], mdl.times[-1]+1, mdl.tstep)
-        shift = 0
-        if track:  mdlhist = init_mdlhist(mdl, timerange)
+        stepshift = 0
     if not track: mdlhist={}
+    else:
+        #only the time-steps in recinds are recorded (at the index in the history given by recinds)
+        trackspec = get_trackspec(mdl, track)
+        steps = get_recinds(mdl, trackspec)
+        shift = len([step for step in steps if step<stepshift])
+        recinds = {step-stepshift: r_ind for r_ind, step in enumerate(steps[shift:])}
+        if staged and prevhist: mdlhist = copy_suffix(prevhist, shift)
+        else:                   mdlhist = init_mdlhist(mdl, timerange[list(recinds)], trackspec)
+        bindings = bind_mdlhist(mdl, mdlhist)
+        if converge and not tracks_all(mdl, trackspec):
+            raise ValueError("Convergence can only be checked if every flow value, function state, fault, and timer is tracked")
+    if skip_steady: #the model is simulated at (and not skipped past) times when faults are injected, phases change, or copies are made
+        schema = mdl.state_schema()
+        eventtimes = [scen['properties']['time'], *ctimes, *[t for phase in mdl.phases.values() for t in phase]]
+        eventinds = sorted(set(int(np.searchsorted(timerange, t)) for t in eventtimes if t>=timerange[0]))+[len(timerange)-1]
+        prevstate, skip_to = None, 0
     # run model through the time range defined in the object
     c_mdl=dict.fromkeys(ctimes)
     flowstates={}
+    mdl.loops=[]
+    t_conv=None
     for t_ind, t in enumerate(timerange):
+       if skip_steady and t_ind<skip_to: #(the model is in a steady state, so the held states are recorded)
+           if track and t_ind in recinds: record_mdlhist(bindings, recinds[t_ind])
+           continue
        # inject fault when it occurs, track defined flow states and graph
        try:
            if t==scen['properties']['time']: flowstates = propagate(mdl, scen['faults'], t, flowstates)
            else: flowstates = propagate(mdl,[],t, flowstates)
-           if track: update_mdlhist(mdl, mdlhist, t_ind+shift)
-           if t in ctimes: c_mdl[t]=mdl.copy()
-       except:
-            print("Error at t="+str(t))
-            raise
-            break
-    return mdlhist, c_mdl
+           if track and t_ind in recinds: record_mdlhist(bindings, recinds[t_ind])
+           if t in ctimes: c_mdl[t]=mdl.get_state()
+       except Exception as e:
+           raise type(e)("Error at t="+str(t)+" in scenario "+str(scen['properties'].get('name', scen['faults'] or 'nominal'))+": "+str(e)) from e
+       if converge and track and prevhist and t>=scen['properties']['time'] and t_ind in recinds \
+           and converged(mdlhist, prevhist, recinds[t_ind], shift):
+           fill_hist(mdlhist, prevhist, recinds[t_ind], shift)
+           t_conv=t
+           break
+       if skip_steady:
+           state = steady_state(mdl, schema)
+           if prevstate is not None and same_state(state, prevstate): skip_to = min([ind for ind in eventinds if ind>t_ind], default=t_ind)
+           prevstate = state
+    if staged and track and prevhist: mdlhist = splice_hist(prevhist, mdlhist, shift)
+    return mdlhist, c_mdl, t_conv
+
+def converged(mdlhist, prevhist, t_ind, shift=0):
+    """
+    Checks whether the flow values, function states, faults, and timers in the model history mdlhist at t_ind 
+    are the same as in the (nominal) history prevhist at t_ind+shift.
+
+    Parameters
+    ----------
+    mdlhist : dict
+        History of model states in the scenario
+    prevhist : dict
+        History of model states to compare with (e.g. the nominal history)
+    t_ind : int
+        Index in mdlhist to compare
+    shift : int, optional
+        Index in prevhist where mdlhist starts (for staged execution). The default is 0.
+
+    Returns
+    -------
+    converged : bool
+        Whether the states are the same
+    """
+    p_ind = t_ind+shift
+    for fxnname, modes in mdlhist['faultmodes'].items(): #(faults checked first since they usually differ)
+        if fxnname not in mdlhist['functions']: continue
+        faults, prevfaults = mdlhist['functions'][fxnname]['faults'][t_ind], prevhist['functions'][fxnname]['faults'][p_ind]
+        if modes==prevhist['faultmodes'][fxnname]:
+            if faults!=prevfaults: return False
+        elif proc.faultnames(faults, modes)!=proc.faultnames(prevfaults, prevhist['faultmodes'][fxnname]): return False
+    for flowname, atts in mdlhist['flows'].items():
+        for att, vals in atts.items():
+            if vals[t_ind]!=prevhist['flows'][flowname][att][p_ind]: return False
+    for fxnname, states in mdlhist['functions'].items():
+        for state, vals in states.items():
+            if state!='faults' and vals[t_ind]!=prevhist['functions'][fxnname][state][p_ind]: return False
+    for fxnname, timers in mdlhist['timers'].items():
+        for timername, vals in timers.items():
+            if vals[t_ind]!=prevhist['timers'][fxnname][timername][p_ind]: return False
+    return True
+def tracks_all(mdl, trackspec):
+    """ Checks whether a track specification (see get_trackspec()) includes every flow value, function state, fault,
+    and timer in the model (so a scenario can be checked for convergence on its history, see converged())"""
+    fullspec = get_trackspec(mdl)
+    return trackspec['faults'] and trackspec['timers'] \
+        and all(set(atts)<=set(trackspec['flows'].get(flowname, [])) for flowname, atts in fullspec['flows'].items()) \
+        and all(set(states)<=set(trackspec['functions'].get(fxnname, [])) for fxnname, states in fullspec['functions'].items())
+def fill_hist(mdlhist, prevhist, t_ind, shift=0):
+    """ Fills the model history mdlhist after t_ind with the values in the (nominal) history prevhist after t_ind+shift
+    (e.g. when the scenario has re-converged to the nominal scenario)"""
+    p_ind = t_ind+shift
+    fill_vals(mdlhist, prevhist, t_ind, p_ind)
+    for fxnname, prevmodes in prevhist['faultmodes'].items(): #faults are re-encoded if the fault modes differ
+        if mdlhist['faultmodes'][fxnname]!=prevmodes and fxnname in mdlhist['functions']:
+            faults = mdlhist['functions'][fxnname]['faults']
+            for i, code in enumerate(prevhist['functions'][fxnname]['faults'][p_ind+1:]):
+                faults[t_ind+1+i], mdlhist['faultmodes'][fxnname] = encode_faults(proc.faultnames(code, prevmodes), mdlhist['faultmodes'][fxnname])
+def fill_vals(hist, prevhist, t_ind, p_ind):
+    """ Fills each array in hist after t_ind with the values in prevhist after p_ind """
+    for key, vals in hist.items():
+        if isinstance(vals, dict):          fill_vals(vals, prevhist[key], t_ind, p_ind)
+        elif isinstance(vals, np.ndarray):  vals[t_ind+1:] = prevhist[key][p_ind+1:]
+
+def steady_state(mdl, schema):
+    """ Returns the state of the model used to check whether it is in a steady state: the vector of numeric states 
+    in the schema (see Model.to_vector()), the faults of each function and component, and the other states """
+    faults, others = [], []
+    for fxn in mdl.fxns.values():
+        faults.append(fxn.faults.copy())
+        faults.extend([comp.faults.copy() for comp in fxn.components.values()])
+        others.extend([copy_state(getattr(fxn, state)) for state in fxn._states if not is_scalar(getattr(fxn, state))])
+    for flow in mdl.flows.values():
+        others.extend([copy_state(getattr(flow, att)) for att in flow._attributes if not is_scalar(getattr(flow, att))])
+    return mdl.to_vector(schema), faults, others
+def same_state(state, prevstate):
+    """ Checks whether two states from steady_state() are the same"""
+    try:                return np.array_equal(state[0], prevstate[0]) and state[1]==prevstate[1] and bool(state[2]==prevstate[2])
+    except ValueError:  return False
+
+# profile of propagate() (see profile_propagation()), with the calls to updatefxn() in each function and the
+# iterations and function updates in each time-step
+profile = {'enabled':False, 'functions':{}, 'steps':{'time':[], 'iterations':[], 'active functions':[]}}
+def profile_propagation(enable=True):
+    """
+    Enables (or disables) profiling propagate(). When enabled, each call to propagate() records the number of calls
+    to and cumulative time spent in updatefxn() (i.e., the behaviors and condfaults) of each function, as well as the
+    number of iterations of prop_time() and the number of function updates in the time-step. The profile can then
+    be retrieved with get_profile() and tabulated with rd.tabulate.profilefxns() and rd.tabulate.profilesteps().
+    Note that only the propagation in the current process is profiled (i.e., not scenarios run in a process pool).
+
+    Parameters
+    ----------
+    enable : bool, optional
+        Whether to profile propagate(). The default is True.
+    """
+    profile['enabled'] = enable
+def get_profile():
+    """
+    Returns the profile of propagate() recorded since profiling was enabled (or last cleared)
+
+    Returns
+    -------
+    report : dict
+        Profile with structure {'functions':{fxnname:{'calls':int, 'time':float}},
+        'steps':{'time':[times], 'iterations':[iterations], 'active functions':[updates]}}, where 'steps' has an
+        entry for each call to propagate() in the order they were made, and times are in seconds
+    """
+    return copy.deepcopy({'functions':profile['functions'], 'steps':profile['steps']})
+def clear_profile():
+    """ Clears the profile of propagate() (see profile_propagation())"""
+    profile['functions'].clear()
+    for steplist in profile['steps'].values(): steplist.clear()
 
 def propagate(mdl, initfaults, time, flowstates={}):
     """
@@ -365,6 +1506,7 @@ def propagate(mdl, initfaults, time, flowstates={}):
     flowstates : dict
         States of the model at the current time-step.
     """
+    if profile['enabled']: profile['step'] = {'iterations':0, 'active functions':0}
     #set up history of flows to see if any has changed
     activefxns=mdl.timelyfxns.copy()
     nextfxns=set()
@@ -372,20 +1514,32 @@ def propagate(mdl, initfaults, time, flowstates={}):
     if not flowstates:
         for flowname, flow in mdl.flows.items():
             flowstates[flowname]=flow.status()
+            flow._changed=False
     #Step 2: Inject faults if present
     if initfaults:
         flowstates = prop_time(mdl, activefxns, nextfxns, flowstates, time, initfaults)
     for fxnname in initfaults:
         fxn=mdl.fxns[fxnname]
+        starttime = perf_counter()
         if type(initfaults[fxnname])==list: fxn.updatefxn(faults=initfaults[fxnname], time=time)
         else:                               fxn.updatefxn(faults=[initfaults[fxnname]], time=time)
+        if profile['enabled']: update_profile(fxnname, perf_counter()-starttime)
         activefxns.update([fxnname])
     #Step 3: Propagate faults through graph
     flowstates = prop_time(mdl, activefxns, nextfxns, flowstates, time, initfaults)
+    if profile['enabled']:
+        for key, val in zip(profile['steps'], [time, profile['step']['iterations'], profile['step']['active functions']]):
+            profile['steps'][key].append(val)
     return flowstates
 def prop_time(mdl, activefxns, nextfxns, flowstates, time, initfaults):
     """
-    Propagates faults through model graph.
+    Propagates faults through model graph. In each iteration, the active functions are updated in the order
+    mdl.fxnorder (see Model.return_fxnorder()), along with the functions they wake later in the order, so that
+    functions only need to be updated again in later iterations when they are part of a cycle in the model.
+    Propagation is stopped (see loop_event()) if the flow values and declared function states and faults repeat
+    (a 'cycle') or after mdl.maxiter iterations. Note that attributes of functions that are not declared states
+    are not compared, so a function which iterates on them (e.g. a counter set in its behavior) may be taken as a
+    cycle and stopped early--these should be declared as states to run until they settle or reach mdl.maxiter.
 
     Parameters
     ----------
@@ -408,65 +1562,273 @@ def prop_time(mdl, activefxns, nextfxns, flowstates, time, initfaults):
         States of each flow in the model after propagation
     """
     n=0
+    profiled = profile['enabled']
+    looped, statekeys = [], {}
+    order, activefxns = mdl.fxnorder, activefxns.copy()
+    #flows may have been set outside of propagation (e.g. between time-steps), so all are checked at first
+    for flowname, flow in mdl.flows.items():
+        if flow._changed:
+            flowstate = flow.status()
+            if flowstates[flowname]!=flowstate: activefxns.update(mdl.flowreaders[flowname])
+            flowstates[flowname]=flowstate
+            flow._changed=False
     while activefxns:
-        for fxnname in list(activefxns).copy():
+        #functions are updated in (topological) order, so functions woken by a function earlier in the order are
+        #updated in the same iteration, while those woken by later functions (i.e., in cycles) are updated in the next
+        queue = [(order[fxnname], fxnname) for fxnname in activefxns]
+        heapq.heapify(queue)
+        updated, changed = {}, {}
+        while queue:
+            fxnind, fxnname = heapq.heappop(queue)
             #Update functions with new values, check to see if new faults or states
             oldstates, oldfaults = mdl.fxns[fxnname].return_states()
-            mdl.fxns[fxnname].updatefxn(time=time)
+            if profiled:
+                starttime = perf_counter()
+                mdl.fxns[fxnname].updatefxn(time=time)
+                update_profile(fxnname, perf_counter()-starttime)
+            else: mdl.fxns[fxnname].updatefxn(time=time)
             newstates, newfaults = mdl.fxns[fxnname].return_states() 
-            if oldstates != newstates or oldfaults != newfaults: nextfxns.update([fxnname])
-        #Check to see what flows have new values and add connected functions
-        for flowname, flow in mdl.flows.items():
-            if flowstates[flowname]!=flow.status():
-                nextfxns.update(set([n for n in mdl.bipartite.neighbors(flowname)]))
-            flowstates[flowname]=flow.status()
+            if oldstates != newstates or oldfaults != newfaults: nextfxns.add(fxnname)
+            updated[fxnname] = len(updated)
+            #Check to see which flows that were set have new values and add connected functions later in the order
+            for flowname in mdl.fxnneighbors[fxnname]:
+                flow = mdl.flows[flowname]
+                if flow._changed:
+                    flowstate = flow.status()
+                    if flowstates[flowname]!=flowstate:
+                        changed[flowname] = (changed.get(flowname, (flowstates[flowname],))[0], updated[fxnname])
+                        for nextfxn in mdl.flowreaders[flowname]:
+                            if order[nextfxn]>fxnind and nextfxn not in activefxns: 
+                                heapq.heappush(queue, (order[nextfxn], nextfxn))
+                                activefxns.add(nextfxn)
+                    flowstates[flowname]=flowstate
+                    flow._changed=False
+        #Functions reading flows with new values over the iteration that were not updated since they changed
+        #(including the function which changed them, if it reads them) are updated in the next iteration
+        for flowname, (prevstate, changeind) in changed.items():
+            if flowstates[flowname]!=prevstate:
+                nextfxns.update(fxnname for fxnname in mdl.flowreaders[flowname] if updated.get(fxnname, -1)<=changeind)
         activefxns=nextfxns.copy()
         nextfxns.clear()
         n+=1
-        if n>1000: #break if this is going for too long
-            print("Undesired looping in function")
-            print(initfaults)
-            print(fxnname)
-            print(activefxns)
+        if activefxns and n>=len(mdl.fxns): #(propagation without cycles is finished by now, so states are checked for cycles)
+            fxnstates = {fxnname: fxn.return_states() for fxnname, fxn in mdl.fxns.items()}
+            statekey = hashable((activefxns, flowstates, fxnstates))
+            looped.append((flowstates.copy(), fxnstates))
+            if statekey in statekeys: #stop if the model returned to a previous state (since it would then repeat)
+                mdl.loops.append(loop_event(time, 'cycle', n, activefxns, looped[statekeys[statekey]:]))
+                break
+            statekeys[statekey] = len(looped)-1
+        if activefxns and n>=mdl.maxiter: #stop if this is going for too long
+            mdl.loops.append(loop_event(time, 'maxiter', n, activefxns, looped))
             break
+    if profiled: profile['step']['iterations'] += n
     return flowstates
+def loop_event(time, looptype, iterations, activefxns, looped):
+    """
+    Returns a record of a loop in the propagation of the model at a given time-step (see prop_time())
 
-#update_mdlhist
-# find a way to make faster (e.g. by automatically getting values by reference)
-def update_mdlhist(mdl, mdlhist, t_ind):
+    Parameters
+    ----------
+    time : float
+        Time-step the loop occured at
+    looptype : str
+        'cycle' if the model returned to a previous state or 'maxiter' if the iteration limit mdl.maxiter was reached
+    iterations : int
+        Number of iterations of propagation before the loop was stopped
+    activefxns : set
+        Functions active when the loop was stopped
+    looped : list
+        States of the flows and functions in the iterations of the loop with structure [(flowstates, fxnstates)]
+
+    Returns
+    -------
+    loop : dict
+        Record of the loop with structure {'time':float, 'type':str, 'iterations':int, 'functions':[fxnnames],
+        'flows':[flownames]}, where functions and flows are those whose states changed in the loop (or the
+        active functions, if no states were checked)
+    """
+    flows = sorted({flowname for flowstates, _ in looped[1:] for flowname, state in flowstates.items() if state!=looped[0][0][flowname]})
+    fxns = sorted({fxnname for _, fxnstates in looped[1:] for fxnname, state in fxnstates.items() if state!=looped[0][1][fxnname]})
+    return {'time':float(time), 'type':looptype, 'iterations':iterations, 'functions':fxns or sorted(activefxns), 'flows':flows}
+def scen_loops(mdl, scen):
+    """ Returns the loops in propagation (see loop_event()) from the fault time of the scenario scen onward"""
+    return [loop for loop in mdl.loops if loop['time']>=scen['properties']['time']]
+def update_profile(fxnname, duration):
+    """ Adds a call to updatefxn() of the function fxnname taking duration seconds to the profile (of the function
+    and of the function updates in the current time-step, so both count the same calls)"""
+    profile['step']['active functions'] += 1
+    fxnprofile = profile['functions'].setdefault(fxnname, {'calls':0, 'time':0.0})
+    fxnprofile['calls'] += 1
+    fxnprofile['time'] += duration
+
+def bind_mdlhist(mdl, mdlhist):
     """
-    Updates the model history at a given time.
+    Binds the arrays in the model history to the model states they record, so that the history can be updated
+    at each time-step without constructing the states of each flow/function and looking up each value.
 
     Parameters
     ----------
     mdl : model
-        Model at the timestep
+        Model to record the states of
     mdlhist : dict
-        History of model states (a dict with a vector of each state)
-    t_ind : float
-        The time to update the model history at.
-    """
-    update_flowhist(mdl, mdlhist, t_ind)
-    update_fxnhist(mdl, mdlhist, t_ind)
-def update_flowhist(mdl, mdlhist, t_ind):
-    """ Updates the flows in the model history at t_ind """
-    for flowname, flow in mdl.flows.items():
-        atts=flow.status()
-        for att, val in atts.items():
-            try:
-                mdlhist["flows"][flowname][att][t_ind] = val
-            except:
-                print("Value too large to represent: "+att+"="+str(val))
-                raise
-def update_fxnhist(mdl, mdlhist, t_ind):
-    """ Updates the functions (faults and states) in the model history at t_ind """
-    for fxnname, fxn in mdl.fxns.items():
-        states, faults = fxn.return_states()
-        mdlhist["functions"][fxnname]["faults"][t_ind]=faults
-        for state, value in states.items():
-            mdlhist["functions"][fxnname][state][t_ind] = value 
+        History of model states (from init_mdlhist())
 
-def init_mdlhist(mdl, timerange):
+    Returns
+    -------
+    bindings : tuple
+        Tuple of lists (attbindings, statusbindings, faultbindings) with structures:
+        - attbindings: [(obj, attribute, array, name)] for flow attributes, function states, and timers
+        - statusbindings: [(flow, {attribute:array}, flowname)] for flows with custom status() methods
+        - faultbindings: [(fxn, fxnname, array, faultmodes)] for function faults (see encode_faults())
+    """
+    attbindings, statusbindings, faultbindings = [], [], []
+    for flowname, hist in mdlhist["flows"].items():
+        flow = mdl.flows[flowname]
+        if type(flow).status is Flow.status: attbindings.extend([(flow, att, vals, flowname+'.'+att) for att, vals in hist.items()])
+        else:                                statusbindings.append((flow, hist, flowname))
+    for fxnname, hist in mdlhist["functions"].items():
+        fxn = mdl.fxns[fxnname]
+        attbindings.extend([(fxn, state, vals, fxnname+'.'+state) for state, vals in hist.items() if state!='faults'])
+        if 'faults' in hist: faultbindings.append((fxn, fxnname, hist["faults"], mdlhist["faultmodes"]))
+    for fxnname, timers in mdlhist["timers"].items():
+        attbindings.extend([(getattr(mdl.fxns[fxnname], timername), 'time', hist, fxnname+'.'+timername) for timername, hist in timers.items()])
+    return attbindings, statusbindings, faultbindings
+def record_mdlhist(bindings, t_ind):
+    """
+    Records the model states in the model history at t_ind
+
+    Parameters
+    ----------
+    bindings : tuple
+        Bindings of the model states to the model history from bind_mdlhist()
+    t_ind : int
+        The index to update the model history at.
+    """
+    attbindings, statusbindings, faultbindings = bindings
+    name = ''
+    try:
+        for obj, att, hist, name in attbindings:
+            hist[t_ind] = getattr(obj, att)
+        for flow, hists, name in statusbindings:
+            status = flow.status()
+            for att, hist in hists.items():
+                hist[t_ind] = status[att]
+    except (OverflowError, ValueError) as e:
+        raise type(e)("Could not record "+name+" in the model history: "+str(e)) from e
+    for fxn, fxnname, hist, faultmodes in faultbindings:
+        hist[t_ind], faultmodes[fxnname] = encode_faults(fxn.faults, faultmodes[fxnname])
+def update_mdlhist(mdl, mdlhist, t_ind):
+    """ Updates the model history at t_ind with the current states of the model (see record_mdlhist())"""
+    record_mdlhist(bind_mdlhist(mdl, mdlhist), t_ind)
+
+class HistSplice(dict):
+    """
+    History of the states of a flow or function (i.e., {state:values}) in a staged scenario. Only the values 
+    from the time of the scenario onward are stored--the values before are read from the (shared) history 
+    of the scenario it was staged from (e.g. the nominal), so that the history does not have to be copied.
+    Values are spliced together into ordinary arrays/lists when first accessed and kept in spliced, so each is
+    only spliced once and changes made to it are kept (copy() returns an ordinary dict).
+    """
+    def __init__(self, prevhist, shift, hist):
+        super().__init__(hist)
+        self.prevhist = prevhist
+        self.shift = shift
+        self.spliced = {}
+    def __getitem__(self, key):
+        if key not in self.spliced:
+            self.spliced[key] = splice(self.prevhist[key], dict.__getitem__(self, key), self.shift)
+        return self.spliced[key]
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.spliced[key] = value
+    def suffix(self, key):
+        """ Returns the values of key from index shift onward (i.e., the part not shared with prevhist)"""
+        vals = self.spliced.get(key)
+        if isinstance(vals, (list, np.ndarray)):    return vals[self.shift:]
+        else:                                       return dict.__getitem__(self, key)
+    def __iter__(self):                 return dict.__iter__(self) # (makes dict()/update() use __getitem__)
+    def get(self, key, default=None):   return self[key] if key in self else default
+    def items(self):                    return [(key, self[key]) for key in self]
+    def values(self):                   return [self[key] for key in self]
+    def copy(self):                     return {key:self[key] for key in self}
+    def __copy__(self):                 return self.copy()
+    def __deepcopy__(self, memo):       return copy.deepcopy(self.copy(), memo)
+    def __reduce__(self):               return (dict, (self.copy(),))
+    def __repr__(self):                 return repr(self.copy())
+def splice(prevvals, vals, shift):
+    """ Splices the values vals onto the values prevvals before index shift (if vals is an array or list)"""
+    if type(vals)==list:                return prevvals[:shift]+vals
+    elif isinstance(vals, np.ndarray):  return np.concatenate((prevvals[:shift], vals))
+    else:                               return vals
+def splice_hist(prevhist, hist, shift):
+    """
+    Splices the history hist of a staged scenario (from index shift onward) onto the history prevhist it was 
+    staged from, without copying prevhist.
+
+    Parameters
+    ----------
+    prevhist : dict
+        History the scenario was staged from (e.g. the nominal history)
+    hist : dict
+        History of the scenario from index shift onward (e.g. from copy_suffix())
+    shift : int
+        Index in prevhist where the scenario starts
+
+    Returns
+    -------
+    mdlhist : dict
+        History of the scenario over the full time range (with HistSplice objects for each flow/function)
+    """
+    if not any(isinstance(val, dict) for val in hist.values()): return HistSplice(prevhist, shift, hist)
+    return {key: splice_hist(prevhist[key], val, shift) if isinstance(val, dict) else splice(prevhist[key], val, shift) for key, val in hist.items()}
+def split_hist(mdlhist):
+    """ Splits a spliced history (from splice_hist()) into the index it was spliced at and the part stored in the scenario"""
+    if isinstance(mdlhist, HistSplice):     return mdlhist.shift, {key:mdlhist.suffix(key) for key in mdlhist}
+    shift, hist = None, {}
+    for key, val in mdlhist.items():
+        if isinstance(val, dict): shift, hist[key] = split_hist(val)
+    if shift is not None: hist.update({key:val[shift:] for key, val in mdlhist.items() if not isinstance(val, dict)})
+    else: hist = mdlhist
+    return shift, hist
+def copy_suffix(hist, shift):
+    """ Copies the values of a history from index shift onward (e.g. to use as the history of a staged scenario)"""
+    if isinstance(hist, dict):  return {key: copy_suffix(val, shift) for key, val in hist.items()}
+    elif type(hist)==list:      return hist[shift:]
+    elif isinstance(hist, np.ndarray): return hist[shift:].copy()
+    else:                       return hist
+
+def encode_faults(faults, modes):
+    """
+    Encodes a set of faults as an integer bitmask, where each bit corresponds to the fault mode at the same
+    index in the tuple of modes of the function (faults not in the tuple are added to the end of it). Since the 
+    bitmasks are recorded as 64-bit integers, functions with more than 64 modes (including 'nom') are given the 
+    modes None (see init_mdlhist()), and their faults are recorded as (frozen)sets instead.
+
+    Parameters
+    ----------
+    faults : set
+        Faults present in the function
+    modes : tuple or None
+        Fault modes of the function (e.g. mdlhist['faultmodes'][fxnname]), starting with 'nom'
+
+    Returns
+    -------
+    code : int or frozenset
+        Bitmask of faults present (or the faults, if modes is None)
+    modes : tuple or None
+        Fault modes of the function (including any new modes)
+    """
+    if modes is None: return frozenset(faults), modes
+    code = 0
+    for fault in faults:
+        if fault not in modes: 
+            if len(modes)>=64: raise ValueError("Too many fault modes to record as a bitmask (>64), since "+fault+" is not in the faultmodes of the function")
+            modes = modes + (fault,)
+        code |= 1 << modes.index(fault)
+    return code, modes
+
+def init_mdlhist(mdl, timerange, track=True):
     """
     Initializes the model history over a given timerange
 
@@ -475,34 +1837,99 @@ def init_mdlhist(mdl, timerange):
     mdl : model
         the Model object
     timerange : array
-        Numpy array of times to initialize in the dictionary.
+        Numpy array of times to initialize in the dictionary (i.e. the times the history is recorded at).
+    track : bool or dict, optional
+        States to track (True for all states, or a dict specifying the states to track, see get_trackspec()). 
+        The default is True.
 
     Returns
     -------
     mdlhist : dict
-        A dictionary history of each model state over the given timerange.
+        A dictionary history of each model state over the given timerange. The faults of each function are 
+        recorded as bitmasks of the modes in mdlhist['faultmodes'][fxnname] (see encode_faults()), or as sets if 
+        the function has more than 63 fault modes (in which case its modes are None).
     """
+    trackspec = get_trackspec(mdl, track)
     mdlhist={}
-    mdlhist["flows"]=init_flowhist(mdl, timerange)
-    mdlhist["functions"]=init_fxnhist(mdl, timerange)
+    mdlhist["flows"]=init_flowhist(mdl, timerange, trackspec['flows'])
+    mdlhist["faultmodes"]={fxnname: ('nom',)+tuple(fxn.faultmodes) if len(fxn.faultmodes)<64 else None for fxnname, fxn in mdl.fxns.items()}
+    mdlhist["functions"]=init_fxnhist(mdl, timerange, mdlhist["faultmodes"], trackspec['functions'], trackspec['faults'])
+    if trackspec['timers']: mdlhist["timers"]=init_timerhist(mdl, timerange)
+    else:                   mdlhist["timers"]={}
     mdlhist["time"]=np.array([i for i in timerange])
     return mdlhist
-def init_flowhist(mdl, timerange):
-    """ Initializes the flow history flowhist of the model mdl over the time range timerange"""
+def get_trackspec(mdl, track=True, faulttimes=[]):
+    """
+    Returns the full specification of the states to track in the model given the track argument
+
+    Parameters
+    ----------
+    mdl : model
+        the Model object
+    track : bool or dict
+        True (to track all states) or a dict with structure {'functions':{fxnname:[states]}, 
+        'flows':{flowname:[attributes]}, 'faults':bool, 'timers':bool, 'stride':int, 'window':int, 
+        'faulttimes':[times]}. Missing functions/flows are not tracked, while faults are tracked and timers 
+        are not unless specified otherwise. Only every stride-th time-step (default 1) is recorded, along with 
+        every time-step within window (default 0) steps of each of the faulttimes (default []).
+    faulttimes : list, optional
+        Times of the faults injected in the run (added to the faulttimes in track). The default is [].
+
+    Returns
+    -------
+    trackspec : dict
+        The states to track with structure {'functions':{fxnname:[states]}, 'flows':{flowname:[attributes]}, 
+        'faults':bool, 'timers':bool, 'stride':int, 'window':int, 'faulttimes':[times]}
+    """
+    if type(track)==dict:
+        trackspec = {'flows':track.get('flows', {}), 'functions':track.get('functions', {}), \
+                     'faults':track.get('faults', True), 'timers':track.get('timers', False)}
+    else:
+        trackspec = {'flows': {flowname:list(flow.status()) for flowname, flow in mdl.flows.items()}, \
+                     'functions': {fxnname:list(fxn._states) for fxnname, fxn in mdl.fxns.items()}, 'faults':True, 'timers':True}
+        track = {}
+    trackspec.update({'stride':track.get('stride', 1), 'window':track.get('window', 0), \
+                      'faulttimes':sorted(set(track.get('faulttimes', [])).union(faulttimes))})
+    return trackspec
+def get_recinds(mdl, trackspec):
+    """
+    Returns the indices of the time-steps in the model time range (i.e. np.arange(mdl.times[0], mdl.times[-1]+1, 
+    mdl.tstep)) to record the model history at, given the 'stride', 'window', and 'faulttimes' in trackspec 
+    (see get_trackspec()). The first and last time-steps are always recorded.
+    """
+    numsteps = len(np.arange(mdl.times[0], mdl.times[-1]+1, mdl.tstep))
+    recinds = set(range(0, numsteps, trackspec['stride']))
+    recinds.add(numsteps-1)
+    for faulttime in trackspec['faulttimes']:
+        faultind = len(np.arange(mdl.times[0], faulttime, mdl.tstep))
+        recinds.update(range(max(faultind-trackspec['window'], 0), min(faultind+trackspec['window']+1, numsteps)))
+    return sorted(recinds)
+def init_flowhist(mdl, timerange, flows):
+    """ Initializes the flow history flowhist of the model mdl over the time range timerange (for the attributes
+    of each flow given in flows, with structure {flowname:[attributes]})"""
     flowhist={}
-    for flowname, flow in mdl.flows.items():
-        atts=flow.status()
+    for flowname, flowatts in flows.items():
+        atts=mdl.flows[flowname].status()
         flowhist[flowname] = {}
-        for att, val in atts.items():
-            flowhist[flowname][att] = np.full([len(timerange)], val)
+        for att in flowatts:
+            flowhist[flowname][att] = np.full([len(timerange)], atts[att])
     return flowhist
-def init_fxnhist(mdl, timerange):
-    """Initializes the function state history fxnhist of the model mdl over the time range timerange"""
+def init_timerhist(mdl, timerange):
+    """Initializes the history of the timers in each function of the model mdl (that has timers) over the time range timerange"""
+    return {fxnname: {timername: np.full([len(timerange)], getattr(fxn, timername).time, dtype=float) for timername in fxn.timers} \
+            for fxnname, fxn in mdl.fxns.items() if fxn.timers}
+def init_fxnhist(mdl, timerange, faultmodes, fxns, track_faults=True):
+    """Initializes the function state history fxnhist of the model mdl over the time range timerange (for the states
+    of each function given in fxns, with structure {fxnname:[states]}), including the faults of each function if 
+    track_faults (encoded using the fault modes of each function in faultmodes, see encode_faults())"""
     fxnhist = {}
     for fxnname, fxn in mdl.fxns.items():
+        if fxnname not in fxns and not track_faults: continue
         states, faults = fxn.return_states()
         fxnhist[fxnname]={}
-        fxnhist[fxnname]["faults"]=[faults for i in timerange]
-        for state, value in states.items():
-            fxnhist[fxnname][state] = np.full([len(timerange)], value)
+        if track_faults:
+            code, faultmodes[fxnname] = encode_faults(faults, faultmodes[fxnname])
+            fxnhist[fxnname]["faults"]=np.full([len(timerange)], code, dtype=np.uint64 if faultmodes[fxnname] else object)
+        for state in fxns.get(fxnname, []):
+            fxnhist[fxnname][state] = np.full([len(timerange)], states[state])
     return fxnhist
\ No newline at end of file
@@ -8,6 +8,7 @@ Description: A module to simplify model definition
 """
 import numpy as np
 import itertools
+import copy
 import networkx as nx
 
 # MAJOR CLASSES
@@ -31,7 +32,17 @@ class Block(object):
                 - dist : (float of % failures due to this fualt)
                 - oppvect : (list of relative probabilities of the fault occuring in each phase)
                 - rcost : cost of repairing the fault
+        The faults of blocks with up to 63 modes are recorded as bitmasks in the model history (and blocks with 
+        more have them recorded as sets, see propagate.encode_faults()).
+    faultmask : np.array
+        boolean matrix of the faults present in each scenario (rows) when the block is batched (see Model.to_batch()),
+        with a column for each of the fault modes (starting with 'nom')
+    _savedatts : tuple
+        names of attributes which are not declared states but are changed by the behaviors and kept between 
+        time-steps (e.g. a goal), which are then saved and restored along with the states by get_state() and 
+        set_state(). Set in the class definition (e.g. _savedatts = ('goal',)). The default is ().
     """
+    _savedatts = ()
     def __init__(self, states={}, timely=True):
         """
         Instance superclass. Called by FxnBlock and Component classes.
@@ -130,6 +141,27 @@ class Block(object):
     def remove_fault(self, fault_to_remove):
         """Removes fault in the set of faults"""
         self.faults.discard(fault_to_remove)
+    def has_fault_mask(self, fault):
+        """Check if the block has fault (a str) in each scenario of a batch (an array of bools), or if it has the
+        fault (a bool) when not batched (see Model.to_batch())"""
+        if getattr(self, 'faultmask', None) is None: return bool(self.has_fault(fault))
+        if fault not in self._batchmodes:           return np.zeros(len(self.faultmask), dtype=bool)
+        return self.faultmask[:, self._batchmodes[fault]]
+    def has_faults_mask(self, faults):
+        """Check if the block has any in the list of faults in each scenario of a batch (see has_fault_mask())"""
+        if getattr(self, 'faultmask', None) is None: return bool(self.has_faults(faults))
+        return np.any([self.has_fault_mask(fault) for fault in faults], axis=0)
+    def add_fault_mask(self, fault, mask=True):
+        """Adds fault (a str) to the block in the scenarios where mask is True (or if mask is True when not batched)"""
+        if getattr(self, 'faultmask', None) is None: 
+            if mask: self.add_fault(fault)
+        elif fault in self._batchmodes:             self.faultmask[:, self._batchmodes[fault]] |= mask
+        else: raise ValueError("Fault "+fault+" not in the fault modes of "+self.name+" (so cannot be batched)")
+    def remove_fault_mask(self, fault, mask=True):
+        """Removes fault (a str) from the block in the scenarios where mask is True (or if mask is True when not batched)"""
+        if getattr(self, 'faultmask', None) is None: 
+            if mask: self.remove_fault(fault)
+        elif fault in self._batchmodes:             self.faultmask[:, self._batchmodes[fault]] &= np.logical_not(mask)
     def reset(self):            #reset requires flows to be cleared first
         """ Resets the block to the initial state with no faults. Used (only for components) when resetting the model"""
         self.faults.clear()
@@ -152,6 +184,46 @@ class Block(object):
         for state in self._states:
             states[state]=getattr(self,state)
         return states, self.faults.copy()
+    def get_state(self):
+        """
+        Returns the mutable state of the block (to restore with set_state()).
+
+        Returns
+        -------
+        state : dict
+            Copy of the state of the block with structure {'states':{state:value}, 'faults':{faults}, 'time':time,
+            'atts':{attname:value}}, where atts are the attributes in _savedatts and time is None if the block 
+            has no time (i.e. if it is not timely and has not been updated)
+        """
+        return {'states': {state: copy_state(getattr(self, state)) for state in self._states}, \
+                'faults': self.faults.copy(), 'time': getattr(self, 'time', None), \
+                'atts': {att: copy_state(getattr(self, att)) for att in self._savedatts}}
+    def set_state(self, state):
+        """ Sets the states, faults, time, and saved attributes of the block to a state returned by get_state()"""
+        for statename, value in state['states'].items():
+            setattr(self, statename, copy_state(value))
+        self.faults.clear()
+        self.faults.update(state['faults'])
+        if state['time'] is not None:   self.time = state['time']
+        elif hasattr(self, 'time'):     del self.time
+        for att, value in state['atts'].items():
+            setattr(self, att, copy_state(value))
+    def to_batch(self, size):
+        """ Converts the states of the block to arrays over a batch of size scenarios, with the faults in each 
+        scenario held in the boolean matrix faultmask (see Model.to_batch())"""
+        if self._savedatts: raise ValueError("Blocks with saved attributes cannot be batched: "+self.name)
+        if len(getattr(self, 'faultmodes', {}))>=64: raise ValueError("Blocks with more than 63 fault modes cannot be batched: "+self.name)
+        for state in self._states:
+            setattr(self, state, np.full(size, getattr(self, state)))
+        self._batchmodes = {mode: i for i, mode in enumerate(('nom',)+tuple(getattr(self, 'faultmodes', {})))}
+        self.faultmask = np.zeros((size, len(self._batchmodes)), dtype=bool)
+        for fault in self.faults: self.add_fault_mask(fault)
+        if hasattr(self, 'time'): self.time = np.full(size, self.time)
+    def get_batch_state(self, ind):
+        """ Returns the state (see get_state()) of the block in scenario ind of the batch (see to_batch())"""
+        return {'states': {state: getattr(self, state)[ind].item() for state in self._states}, \
+                'faults': {mode for mode, i in self._batchmodes.items() if self.faultmask[ind, i]}, \
+                'time': self.time[ind].item() if hasattr(self, 'time') else None, 'atts': {}}
 
 #Function superclass 
 class FxnBlock(Block):
@@ -170,8 +242,12 @@ class FxnBlock(Block):
         names of timers to be used in the function (if any)
     tstep : float
         timestep of the model in the function (added in model definition)
+    inputs : list
+        names of the flows the function only reads (if declared)
+    outputs : list
+        names of the flows the function only writes (if declared)
     """
-    def __init__(self,flownames,flows, states={}, components={},timers={}, timely=True):
+    def __init__(self,flownames,flows, states={}, components={},timers={}, timely=True, inputs=(), outputs=()):
         """
         Intances the function superclass with the relevant parameters.
 
@@ -189,12 +265,18 @@ class FxnBlock(Block):
             Set of names of timers to use in the function. The default is {}.
         timely : bool, optional
             Whether or not the function depends on time (or just input/output). The default is True.
+        inputs : list, optional
+            Names of the flows (in flownames) the function reads (but does not write). Flows in neither inputs
+            nor outputs are both read and written. The default is ().
+        outputs : list, optional
+            Names of the flows (in flownames) the function writes (but does not read). The default is ().
         """
         self.type = 'function'
         self.name = 'fxnname'
         self.flows=self.make_flowdict(flownames,flows)
         for flow in self.flows.keys():
             setattr(self, flow,self.flows[flow])
+        self.inputs, self.outputs = list(inputs), list(outputs)
         self.components=components
         if not getattr(self, 'faultmodes', []): self.faultmodes={}
         if self.components: self.compfaultmodes= dict()
@@ -269,6 +351,41 @@ class FxnBlock(Block):
         if hasattr(self, 'time'): copy.time=self.time
         if hasattr(self, 'tstep'): copy.tstep=self.tstep
         return copy
+    def get_state(self):
+        """
+        Returns the mutable state of the function (to restore with set_state()), including timers and components.
+
+        Returns
+        -------
+        state : dict
+            Copy of the state of the function with structure {'states':{state:value}, 'faults':{faults}, 'time':time,
+            'atts':{attname:value}, 'timers':{timername:time}, 'components':{compname:componentstate}}
+        """
+        state = super().get_state()
+        state['timers'] = {timername: getattr(self, timername).time for timername in self.timers}
+        state['components'] = {compname: comp.get_state() for compname, comp in self.components.items()}
+        return state
+    def set_state(self, state):
+        """ Sets the states, faults, time, saved attributes, timers, and components of the function to a state returned
+        by get_state()"""
+        super().set_state(state)
+        for timername, time in state['timers'].items():
+            getattr(self, timername).time = time
+        for compname, compstate in state['components'].items():
+            self.components[compname].set_state(compstate)
+    def to_batch(self, size):
+        """ Converts the states, faults, and timers of the function to arrays over a batch of size scenarios (see
+        Model.to_batch())"""
+        if self.components: raise ValueError("Functions with components cannot be batched: "+self.name)
+        super().to_batch(size)
+        for timername in self.timers:
+            getattr(self, timername).time = np.full(size, getattr(self, timername).time)
+    def get_batch_state(self, ind):
+        """ Returns the state (see get_state()) of the function in scenario ind of the batch (see to_batch())"""
+        state = super().get_batch_state(ind)
+        state['timers'] = {timername: getattr(self, timername).time[ind].item() for timername in self.timers}
+        state['components'] = {}
+        return state
     def updatefxn(self,faults=['nom'], time=0):
         """
         Updates the state of the function at a given time and injects faults.
@@ -325,7 +442,15 @@ class Component(Block):
 class Flow(object):
     """
     Superclass for flows. Instanced by Model.add_flow but can also be used as a flow superclass if flow attributes are not easily definable as a dict.
+    
+    Attributes holding lists/arrays should be reassigned (e.g. flow.pos = [x, y]) rather than modified in place 
+    (e.g. flow.pos[0] = x), since propagation only checks flows with attributes that were set (see __setattr__()) 
+    for changes, so in-place changes do not update the functions reading the flow.
+    
+    Other attributes of flow subclasses which change over a run (e.g. a trajectory) should be listed in the class 
+    attribute _savedatts (e.g. _savedatts = ('traj',)) so they are saved and restored by get_state() and set_state().
     """
+    _savedatts = ()
     def __init__(self, attributes, name):
         """
         Instances the flow with given attributes.
@@ -345,6 +470,11 @@ class Flow(object):
             setattr(self, attribute, attributes[attribute])
     def __repr__(self):
         return self.name+' '+self.type+': '+str(self.status())
+    def __setattr__(self, name, value):
+        """ Sets the attribute and marks the flow as changed (so propagation only checks changed flows). Attributes
+        modified in place (without being set) are not marked."""
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_changed', name!='_changed' or value)
     def reset(self):
         """ Resets the flow to the initial state"""
         for attribute in self._initattributes:
@@ -357,6 +487,22 @@ class Flow(object):
         for attribute in self._attributes:
             attributes[attribute]=getattr(self,attribute)
         return attributes
+    def get_state(self):
+        """ Returns a copy of the attributes (and saved attributes, see _savedatts) of the flow with structure 
+        {attribute:value} (to restore with set_state())"""
+        return {attribute: copy_state(getattr(self, attribute)) for attribute in (*self._attributes, *self._savedatts)}
+    def set_state(self, state):
+        """ Sets the attributes of the flow to a state returned by get_state()"""
+        for attribute, value in state.items():
+            setattr(self, attribute, copy_state(value))
+    def to_batch(self, size):
+        """ Converts the attributes of the flow to arrays over a batch of size scenarios (see Model.to_batch())"""
+        if self._savedatts: raise ValueError("Flows with saved attributes cannot be batched: "+self.name)
+        for attribute in self._attributes:
+            setattr(self, attribute, np.full(size, getattr(self, attribute)))
+    def get_batch_state(self, ind):
+        """ Returns the state (see get_state()) of the flow in scenario ind of the batch (see to_batch())"""
+        return {attribute: getattr(self, attribute)[ind].item() for attribute in self._attributes}
     def copy(self):
         """
         Returns a copy of the flow object (used when copying the model)
@@ -391,14 +537,32 @@ class Model(object):
         set of functions that are timely (depend on time, not just input/output)
     bipartite : networkx graph
         bipartite graph view of the functions and flows
+    flowneighbors : dict
+        functions connected to each flow with structure {flowname:{fxnnames}}
+    flowreaders : dict
+        functions reading each flow (i.e., not declared as only writing it) with structure {flowname:{fxnnames}}
+    fxnneighbors : dict
+        flows connected to each function with structure {fxnname:[flownames]}
+    flowindex : dict
+        order of each flow in the model with structure {flowname:index}
+    fxngraph : networkx graph
+        directed graph of functions, with edges from each function to the functions reading the flows it writes
+    fxnorder : dict
+        order to update the functions in during propagation with structure {fxnname:index} (see return_fxnorder())
     graph : networkx graph
         multigraph view of functions and flows
+    maxiter : int
+        maximum number of iterations of propagation in a time-step before it is stopped (set with modelparams['maxiter'])
+    loops : list
+        loops detected in propagation in the current run (see propagate.loop_event()). Cycles are detected from
+        the declared states of the functions, so attributes changed in behaviors should be declared as states
+        (see propagate.prop_time())
     """
     def __init__(self, params={},modelparams={}):
         """
         Instantiates internal model attributes with predetermined:
             - params (design variables of he model), and
-            - modelparams (dictionary of phases, times, and timestep to run the model with)
+            - modelparams (dictionary of phases, times, timestep, and (optionally) maxiter to run the model with)
         """
         self.type='model'
         self.flows={}
@@ -410,6 +574,8 @@ class Model(object):
         self.times=modelparams.get('times',[1])
         self.tstep = modelparams.get('tstep', 1.0)
         self.units = modelparams.get('units', 'hr')
+        self.maxiter = modelparams.get('maxiter', 1000)
+        self.loops = []
         
         self.timelyfxns=set()
         self._fxnflows=[]
@@ -432,7 +598,7 @@ class Model(object):
         elif type(flowdict) == dict:    self.flows[flowname]=Flow(flowdict, flowname)
         elif isinstance(flowdict, Flow):self.flows[flowname] = flowdict
         else: raise Exception('Invalid flow. Must be dict or flow')
-    def add_fxn(self,name, flownames, fclass=GenericFxn, fparams='None'):
+    def add_fxn(self,name, flownames, fclass=GenericFxn, fparams='None', inputs=None, outputs=None):
         """
         Instantiates a given function in the model.
 
@@ -446,6 +612,12 @@ class Model(object):
             Class to instantiate the function as.
         fparams : arbitrary float, dict, list, etc.
             Other parameters to send to the __init__ method of the function class
+        inputs : list, optional
+            Flows (in flownames) the function reads but does not write, so changes made by the function do not
+            wake it in propagation. The default is None (the inputs declared in the function class, if any).
+        outputs : list, optional
+            Flows (in flownames) the function writes but does not read, so changes made by other functions do not
+            wake it in propagation. The default is None (the outputs declared in the function class, if any).
         """
         flows=self.get_flows(flownames)
         if fparams=='None':
@@ -454,8 +626,15 @@ class Model(object):
         else: 
             self.fxns[name]=fclass(flows,fparams)
             self._fxninput[name]={'flows': flownames, 'fparams': fparams}
+        #(flows declared in the function class are named by their names in the function)
+        fxnflownames = dict(zip(self.fxns[name].flows, flownames))
+        if inputs is None:  inputs = [fxnflownames[flowname] for flowname in getattr(self.fxns[name], 'inputs', [])]
+        if outputs is None: outputs = [fxnflownames[flowname] for flowname in getattr(self.fxns[name], 'outputs', [])]
+        if not set(inputs).union(outputs).issubset(flownames): 
+            raise ValueError('Inputs/outputs of '+name+' not in flows of the function: '+str(set(inputs).union(outputs).difference(flownames)))
         for flowname in flownames:
-            self._fxnflows.append((name, flowname))
+            self._fxnflows.append((name, flowname, {'reads': flowname in inputs or flowname not in outputs, 
+                                                    'writes': flowname in outputs or flowname not in inputs}))
         if self.fxns[name].timely: self.timelyfxns.update([name])
         self.fxns[name].tstep=self.tstep
         self.fxns[name].name=name
@@ -475,6 +654,19 @@ class Model(object):
         self.bipartite.add_nodes_from(self.fxns, bipartite=0)
         self.bipartite.add_nodes_from(self.flows, bipartite=1)
         self.bipartite.add_edges_from(self._fxnflows)
+        self.flowneighbors = {flowname: set(self.bipartite.neighbors(flowname)) for flowname in self.flows}
+        self.flowreaders = {flowname: {fxnname for fxnname in fxnnames if self.bipartite.edges[fxnname, flowname].get('reads', True)} \
+                            for flowname, fxnnames in self.flowneighbors.items()}
+        flowwriters = {flowname: {fxnname for fxnname in fxnnames if self.bipartite.edges[fxnname, flowname].get('writes', True)} \
+                       for flowname, fxnnames in self.flowneighbors.items()}
+        self.fxnneighbors = {fxnname: list(self.bipartite.neighbors(fxnname)) for fxnname in self.fxns}
+        self.flowindex = {flowname: i for i, flowname in enumerate(self.flows)}
+        #functions are connected to the functions which read the flows they write
+        self.fxngraph = nx.DiGraph()
+        self.fxngraph.add_nodes_from(self.fxns)
+        self.fxngraph.add_edges_from((fxnname, nextfxn) for flowname, fxnnames in flowwriters.items()
+                                     for fxnname in fxnnames for nextfxn in self.flowreaders[flowname] if nextfxn!=fxnname)
+        self.fxnorder = self.return_fxnorder()
         self.multgraph = nx.projected_graph(self.bipartite, self.fxns,multigraph=True)
         self.graph = nx.projected_graph(self.bipartite, self.fxns)
         attrs={}
@@ -492,6 +684,22 @@ class Model(object):
         self.graph_pos=graph_pos
         self.bipartite_pos=bipartite_pos
         return self.graph
+    def return_fxnorder(self):
+        """
+        Returns the order to update the functions of the model in during propagation, given by the topological order
+        of the strongly connected components (i.e., cycles) of the function graph mdl.fxngraph, with components
+        (and the functions in each component) otherwise in the order they were added to the model.
+
+        Returns
+        -------
+        fxnorder : dict
+            Index of each function in the update order with structure {fxnname:index}
+        """
+        addorder = {fxnname: i for i, fxnname in enumerate(self.fxns)}
+        sccgraph = nx.condensation(self.fxngraph)
+        sccorder = nx.lexicographical_topological_sort(sccgraph, key=lambda scc: min(addorder[fxnname] for fxnname in sccgraph.nodes[scc]['members']))
+        fxnnames = [fxnname for scc in sccorder for fxnname in sorted(sccgraph.nodes[scc]['members'], key=addorder.get)]
+        return {fxnname: i for i, fxnname in enumerate(fxnnames)}
     def return_paramgraph(self):
         """ Returns a graph representation of the flows in the model, where flows are nodes and edges are 
         associations in functions """
@@ -614,6 +822,113 @@ class Model(object):
             else:                   copy.fxns[fxnname]=fxn.copy(flows, fparams)
         _ = copy.construct_graph(graph_pos=self.graph_pos, bipartite_pos=self.bipartite_pos)
         return copy
+    def get_state(self):
+        """
+        Returns the mutable state of the model (the attributes of each flow and the states, faults, time, timers, and 
+        components of each function), which can be restored with set_state(). Unlike copy(), this does not 
+        instantiate a new model, so a single model can be set to different states (e.g. in staged execution).
+        Note that only the declared states/attributes are captured (along with the attributes listed in the 
+        _savedatts of each function, component, or flow class), so any other attribute the behaviors change and 
+        keep between time-steps must be declared or listed in _savedatts for the model to be set back to that point 
+        of the run (this can be checked in staged execution with reuse='verify', see propagate.approach()).
+
+        Returns
+        -------
+        state : dict
+            Copy of the state of the model with structure {'flows':{flowname:flowstate}, 'fxns':{fxnname:fxnstate}}
+        """
+        return {'flows': {flowname: flow.get_state() for flowname, flow in self.flows.items()}, \
+                'fxns': {fxnname: fxn.get_state() for fxnname, fxn in self.fxns.items()}}
+    def set_state(self, state):
+        """ Sets the model to a state returned by get_state() """
+        for flowname, flowstate in state['flows'].items():
+            self.flows[flowname].set_state(flowstate)
+        for fxnname, fxnstate in state['fxns'].items():
+            self.fxns[fxnname].set_state(fxnstate)
+    def to_batch(self, size):
+        """
+        Converts the model to a batch of size copies of the model (e.g. to run a set of scenarios in lockstep in 
+        propagate.exec_batch()), where each flow attribute, function state, and timer is an array with a value for
+        each scenario and the faults of each function are held in a boolean matrix (faultmask) of the scenarios by 
+        fault modes. Function behaviors then need to be written so they work on these arrays (e.g. using 
+        has_fault_mask(), add_fault_mask(), select(), and numpy functions rather than if/else statements), and
+        should assign (rather than modify) flow attributes, so that changes are registered in propagation.
+
+        Parameters
+        ----------
+        size : int
+            Number of scenarios in the batch
+        """
+        for flowname, flow in self.flows.items():
+            flow.to_batch(size)
+        for fxnname, fxn in self.fxns.items():
+            fxn.to_batch(size)
+    def get_batch_state(self, ind):
+        """ Returns the state (see get_state()) of the model in scenario ind of the batch (see to_batch()), e.g. to 
+        set a (non-batched) model to with set_state()"""
+        return {'flows': {flowname: flow.get_batch_state(ind) for flowname, flow in self.flows.items()}, \
+                'fxns': {fxnname: fxn.get_batch_state(ind) for fxnname, fxn in self.fxns.items()}}
+    def state_schema(self):
+        """
+        Returns the schema of the numeric (scalar) states of the model, i.e. the flow attributes, function states, 
+        component states, and timers, used to pack the states into a vector in to_vector() and from_vector()
+
+        Returns
+        -------
+        schema : list
+            List of the states with structure [(objtype, objname, attribute)], where objtype is 'flows', 'fxns', 
+            'components' (with objname (fxnname, compname)), or 'timers' (with objname fxnname and attribute timername)
+        """
+        schema = []
+        for flowname, flow in self.flows.items():
+            schema.extend([('flows', flowname, att) for att in flow._attributes if is_scalar(getattr(flow, att))])
+        for fxnname, fxn in self.fxns.items():
+            schema.extend([('fxns', fxnname, state) for state in fxn._states if is_scalar(getattr(fxn, state))])
+            for compname, comp in fxn.components.items():
+                schema.extend([('components', (fxnname, compname), state) for state in comp._states if is_scalar(getattr(comp, state))])
+            schema.extend([('timers', fxnname, timername) for timername in fxn.timers])
+        return schema
+    def return_bindings(self, schema):
+        """ Returns a list of the objects and attributes (obj, attribute) in the model holding each state in the schema 
+        (see state_schema())"""
+        bindings = []
+        for objtype, objname, att in schema:
+            if objtype=='flows':        bindings.append((self.flows[objname], att))
+            elif objtype=='fxns':       bindings.append((self.fxns[objname], att))
+            elif objtype=='components': bindings.append((self.fxns[objname[0]].components[objname[1]], att))
+            elif objtype=='timers':     bindings.append((getattr(self.fxns[objname], att), 'time'))
+            else: raise Exception("Invalid state schema type: "+str(objtype))
+        return bindings
+    def to_vector(self, schema=None):
+        """
+        Packs the numeric states of the model into a vector (e.g. to compare, hash, or send model states cheaply).
+
+        Parameters
+        ----------
+        schema : list, optional
+            Schema of the states to pack (from state_schema()). The default is None, which uses state_schema().
+
+        Returns
+        -------
+        vector : np.array
+            float64 array of the values of the states in the schema
+        """
+        if schema is None: schema = self.state_schema()
+        return np.fromiter((getattr(obj, att) for obj, att in self.return_bindings(schema)), dtype=np.float64, count=len(schema))
+    def from_vector(self, vector, schema=None):
+        """
+        Sets the numeric states of the model to the values in a vector from to_vector() (keeping the type of each state)
+
+        Parameters
+        ----------
+        vector : np.array
+            Array of the values of the states in the schema
+        schema : list, optional
+            Schema of the states in the vector (from state_schema()). The default is None, which uses state_schema().
+        """
+        if schema is None: schema = self.state_schema()
+        for (obj, att), val in zip(self.return_bindings(schema), vector):
+            setattr(obj, att, type(getattr(obj, att))(val))
     def reset(self):
         """Resets the model to the initial state (with no faults, etc)"""
         for flowname, flow in self.flows.items():
@@ -623,6 +938,14 @@ class Model(object):
     def find_classification(self,resgraph, endfaults, endflows, scen, mdlhists):
         """Placeholder for model find_classification methods (for running nominal models)"""
         return {'rate':scen['properties']['rate'], 'cost': 1, 'expected cost': 1}
+    def expcost_bound(self, scen):
+        """
+        Returns an upper bound on the magnitude of the expected cost of a fault scenario (i.e. its rate times a bound
+        on the cost from find_classification()), used to order the scenarios and bound the error in the total 
+        expected cost when the scenarios are run with a cost tolerance (see propagate.approach()). Models can 
+        override this method--by default, no bound is given (None), so every scenario is run.
+        """
+        return None
 
 class Timer():
     """class for model timers used in functions (e.g. for conditional faults) """
@@ -632,9 +955,10 @@ class Timer():
     def t(self):
         """ Returns the time elapsed """
         return self.time
-    def inc(self, tstep):
-        """ Increments the time elapsed by tstep"""
-        self.time+=tstep
+    def inc(self, tstep, mask=True):
+        """ Increments the time elapsed by tstep (in the scenarios of a batch where mask is True, see Model.to_batch())"""
+        if isinstance(mask, np.ndarray):    self.time = np.where(mask, self.time+tstep, self.time)
+        elif mask:                          self.time+=tstep
     def reset(self):
         """ Resets the time to zero"""
         self.time=0
@@ -1053,4 +1377,33 @@ def accumulate(vec):
     """ Accummulates vector (e.g. if input =[1,1,1, 0, 1,1], output = [1,2,3,3,4,5])"""
     return [sum(vec[:i+1]) for i in range(len(vec)) ]
 
-    
\ No newline at end of file
+def is_scalar(value):
+    """ Checks whether a state value is a numeric scalar (that can be represented in a float64 state vector)"""
+    return isinstance(value, (int, float, np.number, np.bool_))
+def select(conditions, choices, default):
+    """
+    Returns the choice corresponding to the first condition that is true (or default if none are). Works the same
+    as numpy.select() on arrays of conditions, so behaviors can be written for both single scenarios and batches 
+    of scenarios (see Model.to_batch()) as e.g. select([self.has_fault_mask('no_v')], [0.0], 1.0)
+
+    Parameters
+    ----------
+    conditions : list
+        Conditions (bools or arrays of bools) to check in order
+    choices : list
+        Values to return for each condition
+    default : any
+        Value to return if none of the conditions are true
+
+    Returns
+    -------
+    value : any
+        The selected value (or array of values)
+    """
+    if all(isinstance(condition, (bool, np.bool_)) for condition in conditions):
+        return next((choice for condition, choice in zip(conditions, choices) if condition), default)
+    return np.select(conditions, choices, default)
+def copy_state(value):
+    """ Copies a state value (so the state is not shared), skipping values that are immutable"""
+    if isinstance(value, (int, float, str, bool, np.number, type(None))): return value
+    return copy.deepcopy(value)
@@ -2,4 +2,5 @@
 import fmdtools.resultdisp.tabulate as tabulate
 import fmdtools.resultdisp.process as process
 import fmdtools.resultdisp.graph as graph
-import fmdtools.resultdisp.plot as plot
\ No newline at end of file
+import fmdtools.resultdisp.plot as plot
+import fmdtools.resultdisp.store as store
\ No newline at end of file
@@ -26,6 +26,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation
 import netgraph
+import fmdtools.resultdisp.process as proc
 
 def set_pos(g, gtype='normal',scale=1,node_color='gray', label_size=8, initpos={}):
     """
@@ -427,7 +428,7 @@ def get_plotlabels(g, reshist, t_ind):
     for function in functions:
         if reshist['functions'][function]['numfaults'][t_ind]:
             faultfxns+=[function] 
-            faultlabels[function] = reshist['functions'][function]['faults'][t_ind].difference('nom')
+            faultlabels[function] = proc.faultnames(reshist['functions'][function]['faults'][t_ind], reshist['faultmodes'].get(function)).difference(['nom'])
         if not reshist['functions'][function]['status'][t_ind]:
             degfxns+=[function]
     flows = reshist['flows'].keys()
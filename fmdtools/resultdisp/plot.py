@@ -53,10 +53,10 @@ def mdlhist(mdlhist, fault='', time=0, fxnflows=[], returnfigs=False, legend=Tru
                 if 'faulty' in mdlhists: hist = mdlhists['faulty']["flows"][fxnflow]
             elif objtype=="functions":
                 nomhist=copy.deepcopy(mdlhists['nominal']["functions"][fxnflow])
-                del nomhist['faults']
+                nomhist.pop('faults', None)
                 if 'faulty' in mdlhists: 
                     hist = copy.deepcopy(mdlhists['faulty']["functions"][fxnflow])
-                    del hist['faults']
+                    hist.pop('faults', None)
             plots=len(nomhist)
             if plots:
                 fig = plt.figure()
@@ -134,10 +134,10 @@ def mdlhistvals(mdlhist, fault='', time=0, fxnflowvals={}, cols=2, returnfig=Fal
                 if 'faulty' in mdlhists: hist = mdlhists['faulty']["flows"][fxnflow]
             elif objtype=="functions":
                 nomhist=copy.deepcopy(mdlhists['nominal']["functions"][fxnflow])
-                del nomhist['faults']
+                nomhist.pop('faults', None)
                 if 'faulty' in mdlhists: 
                     hist = copy.deepcopy(mdlhists['faulty']["functions"][fxnflow])
-                    del hist['faults']
+                    hist.pop('faults', None)
 
             for var in nomhist:
                 if fxnflowvals: #if in the list of values
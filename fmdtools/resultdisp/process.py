@@ -10,6 +10,10 @@ Uses methods:
     - hist:                     Compares model history with the nominal model history over time to make a history of degradation.
         - fxnhist:              Compares the history of function states in mdlhist over time.
         - flowhist:             Compares the history of flow states in mdlhist over time.
+    - countfaults:              Counts the number of faults (other than 'nom') in a function fault history (bitmask array).
+        - bitcount:             Counts the number of bits set in each value of an array of integer bitmasks.
+    - faultnames:               Decodes a fault bitmask into the set of fault modes present.
+    - faultsets:                Decodes the fault history of a function in a model history into a list of sets of faults.
     - graphflows:               Extracts non-nominal flows by comparing the a results graph with a nominal results graph.
     - resultsgraph:        Makes a dict history of results graphs given a dict history of the nominal and faulty graphs
     - resultsgraphs:       Makes a dict history of results graphs given a dict history of the nominal and faulty graphs
@@ -24,6 +28,8 @@ Also used for graph heatmaps, which use the results history to map results histo
     - faultmaps:           Makes dict of heatmaps dictionaries of resulting faults given a results history.
     - faultsheatmap:       Makes a heatmap dictionary of the average resulting faults over all scenarios
     - expfaultsheatmap:    Makes a heatmap dictionary of the expected resulting faults over all scenarios
+    - totalcost:           Sums the expected cost of the scenarios in endclasses
+    - totalcost_error:     Returns the bound on the error in the total expected cost of scenarios run with a cost tolerance
 """
 
 import copy
@@ -84,6 +90,7 @@ def hist(mdlhist, nomhist={}, returndiff=True):
     if nomhist: mdlhist={'nominal':nomhist, 'faulty':mdlhist}
     reshist = {}
     reshist['time'] = mdlhist['nominal']['time']
+    reshist['faultmodes'] = mdlhist['faulty'].get('faultmodes', {}) #(older histories record faults as sets)
     reshist['flowvals'], reshist['flows'], degflows, numdegflows, flowdiff = flowhist(mdlhist, returndiff=returndiff)
     reshist['functions'], numfaults, degfxns, numdegfxns, fxndiff = fxnhist(mdlhist, returndiff=returndiff)
     reshist['stats'] = {'degraded flows': numdegflows, 'degraded functions': numdegfxns, 'total faults': numfaults}
@@ -117,7 +124,7 @@ def fxnhist(mdlhist, returndiff=True):
     diff = {}
     for fxnname in mdlhist['nominal']['functions']:
         fhist = copy.copy(mdlhist['faulty']['functions'][fxnname])
-        del fhist['faults']
+        fhist.pop('faults', None)
         fxnshist[fxnname] = {}
         diff[fxnname]={}
         for state in fhist:
@@ -126,10 +133,11 @@ def fxnhist(mdlhist, returndiff=True):
             fxnshist[fxnname][state] = 1* (faulty == nominal)
             diff[fxnname][state] = nominal - faulty
         if fxnshist[fxnname]: status = np.prod(np.array(list(fxnshist[fxnname].values())), axis = 0) 
-        else: status = np.ones(len(mdlhist['faulty']['functions'][fxnname]['faults']), dtype=int) #should empty be given 1 or nothing?
-        fxnshist[fxnname]['faults']=mdlhist['faulty']['functions'][fxnname]['faults']
-        faults = mdlhist['faulty']['functions'][fxnname]['faults']
-        fxnshist[fxnname]['numfaults']=np.array(list(map(lambda f: len(f.difference(['nom'])), faults)))
+        else: status = np.ones(len(mdlhist['faulty']['time']), dtype=int) #should empty be given 1 or nothing?
+        if 'faults' in mdlhist['faulty']['functions'][fxnname]:
+            fxnshist[fxnname]['faults']=mdlhist['faulty']['functions'][fxnname]['faults']
+            fxnshist[fxnname]['numfaults']=countfaults(fxnshist[fxnname]['faults'])
+        else: fxnshist[fxnname]['numfaults']=np.zeros(len(mdlhist['faulty']['time']), dtype=int) #(if faults not tracked)
         faulty = 1 - 1*(fxnshist[fxnname]['numfaults']>0)
         fxnshist[fxnname]['status'] = status*faulty
         faulthist[fxnname]=fxnshist[fxnname]['numfaults']
@@ -138,6 +146,41 @@ def fxnhist(mdlhist, returndiff=True):
     numfaults = np.sum(np.array(list(faulthist.values())), axis=0)
     numdegfxns   = len(deghist) - np.sum(np.array(list(deghist.values())), axis=0)
     return fxnshist, numfaults, degfxns, numdegfxns, diff
+def countfaults(faults):
+    """ Counts the number of faults (other than 'nom') at each time in a function fault history (bitmask array, or
+    list of sets of faults in older histories) """
+    if len(faults) and isinstance(faults[0], (set, frozenset)): return np.array([len(f.difference(['nom'])) for f in faults])
+    return bitcount(np.asarray(faults, dtype=np.uint64) & ~np.uint64(1))
+def bitcount(codes):
+    """ Counts the number of bits set in each value of an array of (64-bit) integer bitmasks """
+    codes = np.ascontiguousarray(codes, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'): return np.bitwise_count(codes).astype(int)
+    bits = np.unpackbits(codes.reshape(-1,1).view(np.uint8), axis=1)
+    return bits.sum(axis=1).reshape(codes.shape).astype(int)
+def faultnames(code, modes):
+    """
+    Decodes a fault bitmask into the set of fault modes present.
+
+    Parameters
+    ----------
+    code : int
+        Bitmask of the faults present (e.g. mdlhist['functions'][fxnname]['faults'][t_ind])
+    modes : tuple
+        Fault modes of the function (e.g. mdlhist['faultmodes'][fxnname]), or None if code is already the set of 
+        faults (as in histories without 'faultmodes')
+
+    Returns
+    -------
+    faults : set
+        Fault modes present (with 'nom' if the function is nominal)
+    """
+    if modes is None: return set(code)
+    code = int(code)
+    return {mode for i, mode in enumerate(modes) if code>>i & 1}
+def faultsets(mdlhist, fxnname):
+    """ Decodes the fault history of function fxnname in the model history mdlhist into a list of the sets of faults at each time"""
+    modes = mdlhist.get('faultmodes', {}).get(fxnname)
+    return [faultnames(code, modes) for code in mdlhist['functions'][fxnname]['faults']]
 def graphflows(g, nomg, gtype='normal'):
     """
     Extracts non-nominal flows by comparing the a results graph with a nominal results graph.
@@ -333,4 +376,8 @@ def expfaultsheatmap(reshists, endclasses):
     return expfaulttable.mean().to_dict()
 def totalcost(endclasses):
     return sum([e['expected cost'] for k,e in endclasses.items()])
+def totalcost_error(endclasses):
+    """Returns the bound on the error in the total expected cost (i.e. totalcost()) of a set of scenarios run with a
+    cost tolerance (see propagate.approach()), which is 0.0 if every scenario was run"""
+    return min([e['error bound'] for k,e in endclasses.items() if 'error bound' in e], default=0.0)
     
@@ -0,0 +1,183 @@
+"""
+File Name: resultdisp/store.py
+
+Description: Saves model results (endclasses and mdlhists) to a directory on disk and loads them back lazily, so
+that the results of a large set of scenarios can be post-processed without re-running the scenarios or loading
+every history into memory. Each scenario is stored in its own sub-directory, with each array of its history stored
+as a .npy file (in sub-directories mirroring the structure of the history) and its endclass in endclass.json.
+The scenarios saved are found from the sub-directories (rather than a shared index), so scenarios can be saved
+to the same directory from several processes at once.
+Arrays are memory-mapped when loaded, so only the parts of each history that are used are read from disk.
+
+Uses methods:
+    - save_results:     Saves the endclasses and mdlhists of a set of scenarios to a directory
+    - save_scen:        Saves the endclass and mdlhist of a single scenario to a directory (e.g. as results are yielded by propagate.iter_approach())
+    - load_results:     Loads the endclasses and (lazily) the mdlhists of the scenarios saved in a directory
+    - load_scen:        Loads the endclass and mdlhist of a single scenario saved in a directory
+    - saved_scens:      Returns the names of the scenarios saved in a directory (in the order they were saved)
+    - HistStore:        Mapping of the scenarios saved in a directory to their mdlhists, which loads each mdlhist when accessed
+Private methods:
+    - save_hist:        Saves a (nested) history dict to a directory
+    - load_endclass:    Loads the endclass of a single scenario from a directory
+    - load_hist:        Loads a (nested) history dict from a directory
+    - load_array:       Loads an array of a history (memory-mapped, unless it holds objects)
+    - scen_path:        Returns the path to the sub-directory of a scenario
+    - save_order:       Returns the time a scenario was first saved (to order the saved scenarios by)
+"""
+import os
+import json
+import time
+import urllib.parse
+from collections.abc import Mapping
+import numpy as np
+
+# time of the last scenario saved in this process (see save_scen())
+saveclock = {'last':0}
+def save_results(path, endclasses, mdlhists):
+    """
+    Saves the endclasses and mdlhists of a set of scenarios (e.g. from propagate.approach()) to a directory
+
+    Parameters
+    ----------
+    path : str
+        Directory to save the results in (created if it does not exist)
+    endclasses : dict
+        Dict of endclasses of each scenario with structure {scenname:endclass}
+    mdlhists : dict
+        Dict of model histories of each scenario (including the nominal) with structure {scenname:mdlhist}
+    """
+    for scenname, mdlhist in mdlhists.items():
+        save_scen(path, scenname, endclasses.get(scenname, {}), mdlhist)
+def save_scen(path, scenname, endclass, mdlhist):
+    """
+    Saves the endclass and mdlhist of a single scenario to a directory. The endclass is written last, so scenarios 
+    that were not completely saved (e.g. if the process was stopped) are not loaded.
+
+    Parameters
+    ----------
+    path : str
+        Directory to save the results in (created if it does not exist)
+    scenname : str
+        Name of the scenario
+    endclass : dict
+        The rate, cost, and expected cost of the scenario ({} for the nominal scenario)
+    mdlhist : dict
+        The history of model states in the scenario
+    """
+    scenpath = scen_path(path, scenname)
+    if os.path.exists(os.path.join(scenpath, 'endclass.json')): os.remove(os.path.join(scenpath, 'endclass.json'))
+    if not os.path.exists(os.path.join(scenpath, 'order.txt')): #(scenarios keep their order if saved again)
+        os.makedirs(scenpath, exist_ok=True)
+        saveclock['last'] = max(time.time_ns(), saveclock['last']+1) #(so each save in a process is ordered after the last)
+        with open(os.path.join(scenpath, 'order.txt'), 'w') as f: f.write(str(saveclock['last']))
+    save_hist(scenpath, mdlhist)
+    with open(os.path.join(scenpath, 'endclass.tmp'), 'w') as f:
+        json.dump(endclass, f, default=lambda val: val.tolist())
+    os.replace(os.path.join(scenpath, 'endclass.tmp'), os.path.join(scenpath, 'endclass.json'))
+def save_hist(path, hist):
+    """ Saves a (nested) history dict to the directory path, with dicts saved as sub-directories, arrays as .npy
+    files, and any other values (e.g. the tuples in mdlhist['faultmodes']) and the order of the keys in values.json"""
+    os.makedirs(path, exist_ok=True)
+    values = {}
+    for key, val in hist.items():
+        filename = os.path.join(path, urllib.parse.quote(key, safe=''))
+        if isinstance(val, dict):           save_hist(filename, val)
+        elif isinstance(val, np.ndarray):   #(saved to a new file in case val is memory-mapped from the old one)
+            np.save(filename+'.tmp.npy', val)
+            os.replace(filename+'.tmp.npy', filename+'.npy')
+        else:                               values[key] = val
+    with open(os.path.join(path, 'values.json'), 'w') as f:
+        json.dump({'keys':list(hist), 'values':values}, f, default=lambda val: val.tolist())
+
+def load_results(path, mmap=True):
+    """
+    Loads the endclasses and mdlhists of the scenarios saved in a directory (by save_results() or save_scen())
+
+    Parameters
+    ----------
+    path : str
+        Directory the results were saved in
+    mmap : bool, optional
+        Whether to memory-map the arrays in each history (True) or read them into memory (False). The default is True.
+
+    Returns
+    -------
+    endclasses : dict
+        Dict of endclasses of each (non-nominal) scenario with structure {scenname:endclass}
+    mdlhists : HistStore
+        Mapping of each scenario (including the nominal) to its model history, which is loaded when accessed
+    """
+    mdlhists = HistStore(path, mmap=mmap)
+    endclasses = {scenname: load_endclass(path, scenname) for scenname in mdlhists if scenname!='nominal'}
+    return endclasses, mdlhists
+def load_scen(path, scenname, mmap=True):
+    """
+    Loads the endclass and mdlhist of a single scenario saved in a directory
+
+    Parameters
+    ----------
+    path : str
+        Directory the results were saved in
+    scenname : str
+        Name of the scenario
+    mmap : bool, optional
+        Whether to memory-map the arrays in the history (True) or read them into memory (False). The default is True.
+
+    Returns
+    -------
+    endclass : dict
+        The rate, cost, and expected cost of the scenario ({} for the nominal scenario)
+    mdlhist : dict
+        The history of model states in the scenario
+    """
+    endclass = load_endclass(path, scenname)
+    mdlhist = load_hist(scen_path(path, scenname), mmap)
+    if 'faultmodes' in mdlhist:
+        mdlhist['faultmodes'] = {fxnname:None if modes is None else tuple(modes) for fxnname, modes in mdlhist['faultmodes'].items()}
+    return endclass, mdlhist
+def load_endclass(path, scenname):
+    """ Loads the endclass of a single scenario saved in a directory (without its history)"""
+    with open(os.path.join(scen_path(path, scenname), 'endclass.json')) as f: return json.load(f)
+def load_hist(path, mmap=True):
+    """ Loads a (nested) history dict saved by save_hist() from the directory path"""
+    with open(os.path.join(path, 'values.json')) as f: saved = json.load(f)
+    hist = {}
+    for key in saved['keys']:
+        filename = os.path.join(path, urllib.parse.quote(key, safe=''))
+        if key in saved['values']:      hist[key] = saved['values'][key]
+        elif os.path.isdir(filename):   hist[key] = load_hist(filename, mmap)
+        else:                           hist[key] = load_array(filename+'.npy', mmap)
+    return hist
+def load_array(filename, mmap=True):
+    """ Loads an array saved by save_hist(), memory-mapped if mmap, unless it holds objects (e.g. the sets of faults 
+    of a function with too many fault modes to record as bitmasks), which are read into memory"""
+    try:                return np.load(filename, mmap_mode='r' if mmap else None)
+    except ValueError:  return np.load(filename, allow_pickle=True)
+def saved_scens(path):
+    """ Returns the names of the scenarios (completely) saved in the directory path, in the order they were saved"""
+    if not os.path.isdir(path): return []
+    scennames = [urllib.parse.unquote(name) for name in os.listdir(path) if os.path.exists(os.path.join(path, name, 'endclass.json'))]
+    return sorted(scennames, key=lambda scenname: (save_order(path, scenname), scenname))
+def scen_path(path, scenname):
+    """ Returns the path to the sub-directory scenario scenname is saved in"""
+    return os.path.join(path, urllib.parse.quote(scenname, safe=''))
+def save_order(path, scenname):
+    """ Returns the time (in ns) scenario scenname was first saved in the directory path"""
+    with open(os.path.join(scen_path(path, scenname), 'order.txt')) as f: return int(f.read())
+
+class HistStore(Mapping):
+    """
+    Mapping of the scenarios saved in a directory to their model histories (i.e. {scenname:mdlhist}), which can be
+    used in place of the mdlhists dict returned by propagate.approach(). Each history is loaded (memory-mapped)
+    from disk when accessed, so only the histories in use are held in memory.
+    """
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.mmap = mmap
+        self.scennames = saved_scens(path)
+    def __getitem__(self, scenname):
+        if scenname not in self.scennames: raise KeyError(scenname)
+        return load_scen(self.path, scenname, self.mmap)[1]
+    def __iter__(self):     return iter(self.scennames)
+    def __len__(self):      return len(self.scennames)
+    def __repr__(self):     return 'HistStore('+repr(self.path)+', scenarios: '+repr(self.scennames)+')'
@@ -18,6 +18,9 @@ Uses methods:
     - samptime:       Makes a table of the times sampled for each phase given a dict (i.e. app.sampletimes)
     - summary:        Makes a table of a summary dictionary from a given model run
     - result:         Makes a table of results (degraded functions/flows, cost, rate, expected cost) of a single run
+    - profilefxns:    Makes a table of the calls to and time spent in each function in a profile from propagate.get_profile()
+    - profilesteps:   Makes a table of the iterations and function updates in each time-step in a profile from propagate.get_profile()
+    - dedupsummary:   Makes a table of the scenarios which reused the results of other scenarios (and the runs saved) in a run with dedup=True
     - dicttab:           Makes table of a generic dictionary
     - maptab:            Makes table of a generic map
 Also used for FMEA-like tables:
@@ -28,6 +31,7 @@ Also used for FMEA-like tables:
 """
 import pandas as pd
 import numpy as np
+import fmdtools.resultdisp.process as proc
 
 #makehisttable
 # put history in a tabular format
@@ -54,12 +58,8 @@ def objtab(hist, objtype):
         for att, val in atts.items():
             label=(fxn, att)
             labels=labels+[label]
-            df[label]=val
-        if objtype =='functions':
-            if hist[objtype][fxn].get('faults'):
-                label=(fxn, 'faults')
-                labels+=[label]
-                df[label]=hist[objtype][fxn]['faults']
+            if objtype =='functions' and att=='faults': df[label]=proc.faultsets(hist, fxn)
+            else:                                       df[label]=val
     index = pd.MultiIndex.from_tuples(labels)
     df = df.reindex(index, axis="columns")
     return df
@@ -135,6 +135,56 @@ def result(endresults, summary):
     table['degraded functions'] = [summary['degraded functions']]
     table['degraded flows'] = [summary['degraded flows']]
     return table
+def profilefxns(report):
+    """
+    Makes a table of the calls to and time spent in each function in a profile of the model
+
+    Parameters
+    ----------
+    report : dict
+        Profile of the model from propagate.get_profile()
+
+    Returns
+    -------
+    table : dataframe
+        pandas dataframe with the calls, total time, and time per call of each function (sorted by total time)
+    """
+    table = pd.DataFrame.from_dict(report['functions'], orient='index', columns=['calls', 'time'])
+    table['time per call'] = table['time']/table['calls']
+    return table.sort_values('time', ascending=False)
+def profilesteps(report):
+    """
+    Makes a table of the iterations of propagation and function updates in each time-step in a profile of the model
+
+    Parameters
+    ----------
+    report : dict
+        Profile of the model from propagate.get_profile()
+
+    Returns
+    -------
+    table : dataframe
+        pandas dataframe with the time, iterations, and active functions updated in each time-step profiled
+    """
+    return pd.DataFrame(report['steps'])
+def dedupsummary(endclasses):
+    """
+    Makes a table of the scenarios which reused the results of other scenarios in a run with dedup=True
+    (see propagate.approach()), e.g. to find the number of runs saved with table['runs saved'].sum()
+
+    Parameters
+    ----------
+    endclasses : dict
+        Dict of endclasses of each scenario with structure {scenname:endclass}
+
+    Returns
+    -------
+    table : dataframe
+        pandas dataframe with the scenario reused, time shift, time-steps saved, and fraction of the run saved 
+        (runs saved) for each scenario which reused the results of another
+    """
+    return pd.DataFrame.from_dict({scen: endclass['reused'] for scen, endclass in endclasses.items() if 'reused' in endclass}, \
+                                  orient='index', columns=['scenario', 'shift', 'steps saved', 'runs saved'])
 
 def dicttab(dictionary):
     """Makes table of a generic dictionary"""
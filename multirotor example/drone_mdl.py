@@ -10,12 +10,16 @@ from fmdtools.modeldef import *
 
 #Define specialized flows
 class Direc(Flow):
+    _savedatts = ('traj',)
     def __init__(self):
         self.traj=[0,0,0]
         super().__init__({'x': self.traj[0], 'y': self.traj[1], 'z': self.traj[2], 'power': 1}, 'Trajectory')
     def assign(self, traj):
         self.x, self.y, self.z = traj[0], traj[1], traj[2]
         self.traj=traj
+    def reset(self):
+        super().reset()
+        self.traj=[0,0,0]
     def status(self):
         status={'x': self.traj[0], 'y': self.traj[1], 'z': self.traj[2], 'power': self.power}
         return status.copy()
@@ -248,6 +252,7 @@ class CtlDOF(FxnBlock):
         self.Ctl.upward=self.EEin.effort*self.Cs*upthrottle*self.Dir.power
 
 class PlanPath(FxnBlock):
+    _savedatts = ('goal',)
     def __init__(self, flows, params):
         super().__init__(['EEin','Env','Dir','FS','Rsig'], flows, states={'dx':0.0, 'dy':0.0, 'dz':0.0, 'pt':1, 'mode':'taxi'})
         self.goals = params['flightplan']
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+File name: ex_pump_batch.py
+Created: October 2026
+Description: A version of the pump model (ex_pump.py) with behaviors written to work on batches of scenarios
+
+The behaviors of the functions in this model are written so that they work both on single scenarios and on the
+arrays of states used when the model is batched (see Model.to_batch()), so that sets of scenarios can be run in
+lockstep with propagate.approach(..., batch=size). This is done by:
+    - using has_fault_mask() (rather than has_fault()) to check for faults,
+    - using add_fault_mask() (rather than add_fault()) with the conditions a fault is added under,
+    - using select() and numpy functions (np.minimum etc) rather than if/else statements, and
+    - passing the conditions a timer is incremented under to Timer.inc()
+"""
+from fmdtools.modeldef import *
+from ex_pump import *
+
+class ImportEEBatch(ImportEE):
+    """ Import EE (see ex_pump.ImportEE) """
+    def condfaults(self,time):
+        self.add_fault_mask('no_v', self.EEout.current>15.0)
+    def behavior(self,time):
+        self.effstate = select([self.has_fault_mask('no_v'), self.has_fault_mask('inf_v')], [0.0, 100.0], 1.0)
+        self.EEout.voltage=self.effstate * 500
+class ImportWaterBatch(ImportWater):
+    """ Import Water (see ex_pump.ImportWater) """
+    def behavior(self,time):
+        self.Watout.level = select([self.has_fault_mask('no_wat')], [0.0], 1.0)
+class ExportWaterBatch(ExportWater):
+    """ Export Water (see ex_pump.ExportWater) """
+    def behavior(self,time):
+        self.Watin.area = select([self.has_fault_mask('block')], [0.01], self.Watin.area)
+class ImportSigBatch(ImportSig):
+    """ Import Signal (see ex_pump.ImportSig) """
+    def behavior(self, time):
+        if time<5:      power=0.0
+        elif time<50:   power=1.0
+        else:           power=0.0
+        self.Sigout.power = select([self.has_fault_mask('no_sig')], [0.0], power)
+class MoveWatBatch(MoveWat):
+    """ Move Water (see ex_pump.MoveWat) """
+    def condfaults(self, time):
+        if self.delay:
+            self.timer.inc(self.tstep, mask=(self.Watout.pressure>15.0) & (time>self.time))
+            self.add_fault_mask('mech_break', (self.Watout.pressure>15.0) & (self.timer.time>self.delay))
+        else:
+            self.add_fault_mask('mech_break', self.Watout.pressure>15.0)
+    def behavior(self, time):
+        short, mech_break = self.has_fault_mask('short'), self.has_fault_mask('mech_break')
+        self.EEin.current = select([short, mech_break], [500*10/5000*self.Sigin.power*self.EEin.voltage, 0.2*10/5000*self.Sigin.power*self.EEin.voltage], \
+                                   10/5000*self.Sigin.power*self.EEin.voltage*np.minimum(13.0, self.Watout.pressure))
+        self.eff = select([short, mech_break], [0.0, 0.0], 1.0)
+        self.Watout.pressure = 10/500 * self.Sigin.power*self.eff*np.minimum(1000, self.EEin.voltage)*self.Watin.level/self.Watout.area
+        self.Watout.flowrate = 0.3/500 * self.Sigin.power*self.eff*np.minimum(1000, self.EEin.voltage)*self.Watin.level*self.Watout.area
+        self.Watin.pressure=self.Watout.pressure
+        self.Watin.flowrate=self.Watout.flowrate
+
+class PumpBatch(Pump):
+    """ The pump model (see ex_pump.Pump) with functions that can be batched"""
+    def __init__(self, params={'cost':{'repair', 'water'}, 'delay':10, 'units':'hrs'}):
+        Model.__init__(self, params=params, modelparams = {'phases':{'start':[0,5], 'on':[5, 50], 'end':[50,55]}, 'times':[0,20, 55], 'tstep':1})
+        self.add_flow('EE_1', {'current':1.0, 'voltage':1.0})
+        self.add_flow('Sig_1',  {'power':1.0})
+        self.add_flow('Wat_1', Water())
+        self.add_flow('Wat_2', Water())
+        self.add_fxn('ImportEE',['EE_1'],fclass=ImportEEBatch)
+        self.add_fxn('ImportWater',['Wat_1'],fclass=ImportWaterBatch)
+        self.add_fxn('ImportSignal',['Sig_1'],fclass=ImportSigBatch)
+        self.add_fxn('MoveWater', ['EE_1', 'Sig_1', 'Wat_1', 'Wat_2'],fclass=MoveWatBatch, fparams = params['delay'])
+        self.add_fxn('ExportWater', ['Wat_2'], fclass=ExportWaterBatch)
+        self.construct_graph()
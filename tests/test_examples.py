@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the fault propagation methods in fmdtools.faultsim.propagate on the example models
+
+- uses the pump and multirotor examples to check that models with components, untimely functions, and
+attributes set outside of the declared states can be reset and set back to a checkpoint (in staged execution)
+- uses the batched pump and eps examples to check that batched execution gives the same results as the 
+standard serial execution of the (non-batched) models
+"""
+import os
+import sys
+sys.path.append('../')
+for example in ['pump example', 'multirotor example', 'eps example']:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..', example))
+from fmdtools.modeldef import SampleApproach
+import fmdtools.faultsim.propagate as propagate
+from tests.test_propagate import check_same_results
+from ex_pump import Pump
+from ex_pump_batch import PumpBatch
+from drone_mdl import Drone
+from eps import EPS
+from eps_batch import EPSBatch
+
+def drone_params():
+    params = dict(Drone().params)
+    params['respolicy'] = {'bat':'emland','line':'emland'}
+    return params
+
+def test_drone_set_state():
+    mdl = Drone(params=drone_params())
+    initstate = Drone(params=drone_params()).get_state()
+    flowstates = {}
+    for t in range(20): flowstates = propagate.propagate(mdl, {'AffectDOF':'RFmechbreak'} if t==5 else {}, t, flowstates)
+    mdl.set_state(initstate)
+    assert mdl.get_state()==initstate
+    assert not hasattr(mdl.fxns['DistEE'], 'time')
+    assert mdl.flows['Dir1'].traj==[0,0,0] and mdl.fxns['Planpath'].goal==[0,0,100]
+
+def test_staged_examples():
+    mdl = Pump()
+    ref_results = propagate.single_faults(mdl)
+    check_same_results(propagate.single_faults(mdl, staged=True), ref_results)
+    check_same_results(propagate.single_faults(mdl, staged=True, reuse=True), ref_results)
+    mdl = Drone(params=drone_params())
+    app = SampleApproach(mdl, faults=[('AffectDOF','RFmechbreak'), ('StoreEE','lowcharge'), ('Planpath','degloc'), ('DistEE','short')])
+    ref_results = propagate.approach(mdl, app)
+    check_same_results(propagate.approach(mdl, app, staged=True), ref_results)
+    check_same_results(propagate.approach(mdl, app, staged=True, reuse=True), ref_results)
+
+def test_verify_examples():
+    mdl = Pump()
+    ref_results = propagate.single_faults(mdl)
+    check_same_results(propagate.single_faults(mdl, reuse='verify'), ref_results)
+    check_same_results(propagate.single_faults(mdl, staged=True, reuse='verify'), ref_results)
+    mdl = Drone(params=drone_params())
+    app = SampleApproach(mdl, faults=[('AffectDOF','RFmechbreak'), ('StoreEE','lowcharge'), ('Planpath','degloc'), ('DistEE','short')])
+    ref_results = propagate.approach(mdl, app)
+    check_same_results(propagate.approach(mdl, app, reuse='verify'), ref_results)
+    check_same_results(propagate.approach(mdl, app, staged=True, reuse='verify'), ref_results)
+
+def test_batch_examples():
+    app = SampleApproach(Pump(), defaultsamp={'samp':'fullint'})
+    ref_results = propagate.approach(Pump(), app)
+    for batch in [16, 100, len(app.scenlist)]:
+        check_same_results(propagate.approach(PumpBatch(), app, batch=batch), ref_results)
+    ref_results = propagate.single_faults(EPS())
+    for batch in [4, 10, len(ref_results[0])]:
+        check_same_results(propagate.single_faults(EPSBatch(), batch=batch), ref_results)
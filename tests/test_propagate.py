@@ -0,0 +1,590 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the fault propagation methods in fmdtools.faultsim.propagate
+
+- uses a simple tank model (with timed behavior and conditional faults) to check that the
+different execution options give the same results as the standard serial execution
+"""
+import sys
+import multiprocessing as mp
+import concurrent.futures as cf
+import numpy as np
+import pytest
+sys.path.append('../')
+from fmdtools.modeldef import FxnBlock, Model, SampleApproach, select
+import fmdtools.faultsim.propagate as propagate
+import fmdtools.resultdisp as rd
+
+class ImportWat(FxnBlock):
+    def __init__(self, flows):
+        super().__init__(['Watout', 'Sig'], flows)
+        self.failrate=1e-5
+        self.assoc_modes({'no_wat':[0.5, [1,1], 1000], 'stuck':[0.5, [1,1], 500]})
+    def behavior(self, time):
+        if self.has_fault('no_wat'):    self.Watout.rate=0.0
+        elif self.has_fault('stuck'):   pass
+        else:                           self.Watout.rate=self.Sig.open
+class StoreWat(FxnBlock):
+    def __init__(self, flows):
+        super().__init__(['Watin', 'Watout'], flows, {'level':5.0})
+        self.failrate=1e-5
+        self.assoc_modes({'leak':[1.0, [1,1], 2000]})
+    def condfaults(self, time):
+        if self.level>=10.0: self.add_fault('leak')
+    def behavior(self, time):
+        if time>self.time:
+            if self.has_fault('leak'):  self.level=max(self.level+self.Watin.rate-self.Watout.rate-1.0, 0.0)
+            else:                       self.level=min(self.level+self.Watin.rate-self.Watout.rate, 10.0)
+        self.Watout.rate=min(self.level, 1.0)
+class ControlSig(FxnBlock):
+    def __init__(self, flows):
+        super().__init__(['Sig'], flows)
+        self.failrate=1e-6
+        self.assoc_modes({'no_sig':[0.5, [1,1], 100], 'glitch':[0.5, [1,1], 10]})
+    def behavior(self, time):
+        if self.has_fault('no_sig') or time>=20:    self.Sig.open=0.0
+        elif self.has_fault('glitch'):
+            self.Sig.open=0.0
+            if time>self.time: self.remove_fault('glitch')
+        else:                                       self.Sig.open=1.0
+
+class Tank(Model):
+    def __init__(self, params={}):
+        super().__init__(params=params, modelparams={'phases':{'fill':[0,20], 'empty':[20,30]}, 'times':[0,10,30], 'tstep':1})
+        self.add_flow('Wat_in', {'rate':1.0})
+        self.add_flow('Wat_out', {'rate':1.0})
+        self.add_flow('Sig', {'open':1.0})
+        self.add_fxn('ControlSig', ['Sig'], fclass=ControlSig)
+        self.add_fxn('ImportWat', ['Wat_in', 'Sig'], fclass=ImportWat)
+        self.add_fxn('StoreWat', ['Wat_in', 'Wat_out'], fclass=StoreWat)
+        self.construct_graph()
+    def find_classification(self, resgraph, endfaults, endflows, scen, mdlhists):
+        lostwat = sum(mdlhists['nominal']['flows']['Wat_out']['rate'] - mdlhists['faulty']['flows']['Wat_out']['rate'])
+        modes, modeprops = self.return_faultmodes()
+        cost = sum([c['rcost'] for f,m in modeprops.items() for a, c in m.items()]) + 100*abs(lostwat)
+        rate = scen['properties'].get('rate', 1.0)
+        return {'rate':rate, 'cost':cost, 'expected cost':rate*cost}
+    def expcost_bound(self, scen):
+        #(repair costs are at most those of every mode, and the outflow rate is between 0 and 1 at each time-step)
+        repcost = sum(mode['rcost'] for fxn in self.fxns.values() for mode in fxn.faultmodes.values())
+        return scen['properties'].get('rate', 1.0)*(repcost + 100*len(np.arange(self.times[0], self.times[-1]+1, self.tstep)))
+
+class LoopSig(ControlSig):
+    def __init__(self, flows):
+        super().__init__(flows)
+        self.assoc_modes({'oscillate':[0.5, [1,1], 10], 'drift':[0.5, [1,1], 10]})
+    def behavior(self, time):
+        if self.has_fault('oscillate'): self.Sig.open=1.0-self.Sig.open
+        elif self.has_fault('drift'):   self.Sig.open+=1.0
+        else:                           super().behavior(time)
+class LoopTank(Tank):
+    def __init__(self, params={}):
+        Model.__init__(self, params=params, modelparams={'phases':{'fill':[0,20], 'empty':[20,30]}, 'times':[0,10,30], 'tstep':1, 'maxiter':50})
+        self.add_flow('Wat_in', {'rate':1.0})
+        self.add_flow('Wat_out', {'rate':1.0})
+        self.add_flow('Sig', {'open':1.0})
+        self.add_fxn('ControlSig', ['Sig'], fclass=LoopSig)
+        self.add_fxn('ImportWat', ['Wat_in', 'Sig'], fclass=ImportWat)
+        self.add_fxn('StoreWat', ['Wat_in', 'Wat_out'], fclass=StoreWat)
+        self.construct_graph()
+
+class DirControlSig(ControlSig):
+    def __init__(self, flows):
+        FxnBlock.__init__(self, ['Sig'], flows, outputs=['Sig'])
+        self.failrate=1e-6
+        self.assoc_modes({'no_sig':[0.5, [1,1], 100], 'glitch':[0.5, [1,1], 10]})
+class DirTank(Tank):
+    def __init__(self, params={}):
+        Model.__init__(self, params=params, modelparams={'phases':{'fill':[0,20], 'empty':[20,30]}, 'times':[0,10,30], 'tstep':1})
+        self.add_flow('Wat_in', {'rate':1.0})
+        self.add_flow('Wat_out', {'rate':1.0})
+        self.add_flow('Sig', {'open':1.0})
+        self.add_fxn('ControlSig', ['Sig'], fclass=DirControlSig)
+        self.add_fxn('ImportWat', ['Wat_in', 'Sig'], fclass=ImportWat, inputs=['Sig'], outputs=['Wat_in'])
+        self.add_fxn('StoreWat', ['Wat_in', 'Wat_out'], fclass=StoreWat, inputs=['Wat_in'])
+        self.construct_graph()
+
+class BatchImportWat(ImportWat):
+    def behavior(self, time):
+        self.Watout.rate = select([self.has_fault_mask('no_wat'), self.has_fault_mask('stuck')], [0.0, self.Watout.rate], self.Sig.open)
+class BatchStoreWat(StoreWat):
+    def condfaults(self, time):
+        self.add_fault_mask('leak', self.level>=10.0)
+    def behavior(self, time):
+        newlevel = select([self.has_fault_mask('leak')], [np.maximum(self.level+self.Watin.rate-self.Watout.rate-1.0, 0.0)], \
+                          np.minimum(self.level+self.Watin.rate-self.Watout.rate, 10.0))
+        self.level = select([time>self.time], [newlevel], self.level)
+        self.Watout.rate = np.minimum(self.level, 1.0)
+class BatchLoopSig(LoopSig):
+    def behavior(self, time):
+        oscillate, drift = self.has_fault_mask('oscillate'), self.has_fault_mask('drift')
+        off, glitch = self.has_fault_mask('no_sig') | (time>=20), self.has_fault_mask('glitch')
+        self.Sig.open = select([oscillate, drift, off, glitch], [1.0-self.Sig.open, self.Sig.open+1.0, 0.0, 0.0], 1.0)
+        self.remove_fault_mask('glitch', ~oscillate & ~drift & ~off & glitch & (time>self.time))
+class BatchTank(LoopTank):
+    def __init__(self, params={}):
+        Model.__init__(self, params=params, modelparams={'phases':{'fill':[0,20], 'empty':[20,30]}, 'times':[0,10,30], 'tstep':1, 'maxiter':50})
+        self.add_flow('Wat_in', {'rate':1.0})
+        self.add_flow('Wat_out', {'rate':1.0})
+        self.add_flow('Sig', {'open':1.0})
+        self.add_fxn('ControlSig', ['Sig'], fclass=BatchLoopSig)
+        self.add_fxn('ImportWat', ['Wat_in', 'Sig'], fclass=BatchImportWat)
+        self.add_fxn('StoreWat', ['Wat_in', 'Wat_out'], fclass=BatchStoreWat)
+        self.construct_graph()
+
+def check_same_results(results, ref_results):
+    endclasses, mdlhists = results
+    ref_endclasses, ref_mdlhists = ref_results
+    assert list(endclasses)==list(ref_endclasses)
+    assert endclasses==ref_endclasses
+    for scen, ref_hist in ref_mdlhists.items():
+        for flowname, atts in ref_hist['flows'].items():
+            for att, vals in atts.items():
+                assert np.all(mdlhists[scen]['flows'][flowname][att]==vals)
+        for fxnname, states in ref_hist['functions'].items():
+            for state, vals in states.items():
+                assert np.all(np.array(mdlhists[scen]['functions'][fxnname][state])==np.array(vals))
+
+class CountExecutor(cf.ProcessPoolExecutor):
+    """Process pool which records the number of tasks submitted to it and the most not yet finished at once"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.futures = []
+        self.maxpending = 0
+    def submit(self, *args, **kwargs):
+        self.futures.append(super().submit(*args, **kwargs))
+        self.maxpending = max(self.maxpending, sum(not future.done() for future in self.futures))
+        return self.futures[-1]
+def count_pool(executors, workers=1):
+    """Returns a function creating a CountExecutor with the given initializer (as a pool), adding it to executors"""
+    def pool(**kwargs):
+        executors.append(CountExecutor(max_workers=workers, **kwargs))
+        return executors[-1]
+    return pool
+
+def test_approach_pool():
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    for staged in [False, True]:
+        ref_results = propagate.approach(mdl, app, staged=staged)
+        check_same_results(propagate.approach(mdl, app, staged=staged, pool=2), ref_results)
+    mdl = Tank(params={'levels':np.array([5.0, 10.0])}) #(workers are set up for each call without comparing params)
+    executors = []
+    check_same_results(propagate.approach(mdl, app, staged=True, pool=count_pool(executors)), propagate.approach(mdl, app, staged=True))
+    assert len(executors[0].futures)==len(app.scenlist) and executors[0].maxpending<=2
+    with mp.Pool(2) as pool, pytest.raises(ValueError, match='pool'):
+        propagate.approach(mdl, app, staged=True, pool=pool)
+
+def test_staged_hist():
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    endclasses, mdlhists = propagate.approach(mdl, app, staged=True)
+    check_same_results((endclasses, mdlhists), propagate.approach(mdl, app, staged=False))
+    for scen in app.scenlist:
+        hist = mdlhists[scen['properties']['name']]
+        assert hist['flows']['Wat_out'].prevhist is mdlhists['nominal']['flows']['Wat_out']
+        assert len(hist['functions']['StoreWat'].get('faults'))==len(hist['time'])==len(mdlhists['nominal']['time'])
+    flowhist = mdlhists[app.scenlist[-1]['properties']['name']]['flows']['Wat_out']
+    assert flowhist['rate'] is flowhist['rate']
+    flowhist['rate'][0] = 999.0
+    assert flowhist['rate'][0]==999.0 and flowhist.copy()['rate'][0]==999.0
+    assert mdlhists['nominal']['flows']['Wat_out']['rate'][0]!=999.0
+    flowhist['rate'][-1] = 999.0
+    assert propagate.split_hist(flowhist)[1]['rate'][-1]==999.0
+
+def test_staged_cstride():
+    mdl = Tank()
+    ref_results = propagate.single_faults(mdl, staged=True)
+    for cstride in [2, 7]:
+        check_same_results(propagate.single_faults(mdl, staged=True, cstride=cstride), ref_results)
+
+def test_fault_hist():
+    mdl = Tank()
+    _, _, mdlhists = propagate.one_fault(mdl, 'ImportWat', 'no_wat', time=5)
+    faulthist = mdlhists['faulty']['functions']['ImportWat']['faults']
+    assert faulthist.dtype==np.uint64
+    faults = rd.process.faultsets(mdlhists['faulty'], 'ImportWat')
+    assert faults[:5]==[{'nom'}]*5 and faults[5:]==[{'nom', 'no_wat'}]*26
+    assert list(rd.process.countfaults(faulthist))==[0]*5+[1]*26
+    assert rd.process.faultnames(2**3+2**1, ('nom', 'a', 'b', 'c'))=={'a', 'c'}
+    #histories without 'faultmodes' (e.g. saved by older versions) record the faults as sets
+    oldhists = {scen:{**hist, 'functions':{**hist['functions']}} for scen, hist in mdlhists.items()}
+    for scen, hist in oldhists.items():
+        hist.pop('faultmodes')
+        hist['functions']['ImportWat'] = {'faults':rd.process.faultsets(mdlhists[scen], 'ImportWat')}
+    reshist, _, _ = rd.process.hist(oldhists)
+    assert list(reshist['functions']['ImportWat']['numfaults'])==[0]*5+[1]*26
+    assert rd.process.faultsets(oldhists['faulty'], 'ImportWat')==faults
+
+class ManySig(ControlSig):
+    def __init__(self, flows, params):
+        super().__init__(flows)
+        self.assoc_modes({'mode'+str(i):[0.01, [1,1], 10] for i in range(params['nummodes'])})
+        self.unlisted = params.get('unlisted', False)
+    def behavior(self, time):
+        if self.unlisted and self.has_fault('mode0'): self.add_fault('unlisted')
+        super().behavior(time)
+class ManyTank(Tank):
+    def __init__(self, params={'nummodes':70}):
+        super().__init__(params=params)
+        self.add_fxn('ControlSig', ['Sig'], fclass=ManySig, fparams=params)
+        self.construct_graph()
+
+def test_many_faultmodes():
+    mdl = ManyTank()
+    _, _, mdlhists = propagate.one_fault(mdl, 'ControlSig', 'mode65', time=5)
+    assert mdlhists['faulty']['faultmodes']['ControlSig'] is None
+    faults = rd.process.faultsets(mdlhists['faulty'], 'ControlSig')
+    assert faults[:5]==[{'nom'}]*5 and faults[5:]==[{'nom', 'mode65'}]*26
+    reshist, _, _ = rd.process.hist(mdlhists)
+    assert list(reshist['functions']['ControlSig']['numfaults'])==[0]*5+[1]*26
+    check_same_results(propagate.single_faults(mdl, staged=True, converge=True), propagate.single_faults(mdl))
+    with pytest.raises(ValueError, match='fault modes'):
+        propagate.one_fault(ManyTank(params={'nummodes':61, 'unlisted':True}), 'ControlSig', 'mode0', time=5)
+
+def test_converge():
+    mdl = Tank()
+    for staged in [False, True]:
+        check_same_results(propagate.single_faults(mdl, staged=staged, converge=True), propagate.single_faults(mdl, staged=staged))
+    scen = {'faults':{'ControlSig':'glitch'}, 'properties':{'time':10}}
+    nomhist, _, _ = propagate.prop_one_scen(Tank(), propagate.construct_nomscen(mdl))
+    mdlhist, _, t_conv = propagate.prop_one_scen(Tank(), scen, prevhist=nomhist, converge=True)
+    ref_mdlhist, _, _ = propagate.prop_one_scen(Tank(), scen)
+    assert 20<t_conv<30
+    check_same_results(({}, {'faulty':mdlhist}), ({}, {'faulty':ref_mdlhist}))
+    with pytest.raises(ValueError):
+        propagate.single_faults(mdl, converge=True, track={'flows':{'Sig':['open'], 'Wat_out':['rate']}})
+
+class ClockSig(ControlSig):
+    def __init__(self, flows):
+        FxnBlock.__init__(self, ['Sig'], flows, {'clock':0})
+        self.failrate=1e-6
+        self.assoc_modes({'no_sig':[0.5, [1,1], 100], 'glitch':[0.5, [1,1], 10]})
+    def behavior(self, time):
+        if time>self.time: self.clock+=1
+        super().behavior(time)
+class ClockTank(Tank):
+    def __init__(self, params={}):
+        super().__init__(params=params)
+        self.add_fxn('ControlSig', ['Sig'], fclass=ClockSig)
+        self.construct_graph()
+    def find_classification(self, resgraph, endfaults, endflows, scen, mdlhists):
+        endclass = super().find_classification(resgraph, endfaults, endflows, scen, mdlhists)
+        return {**endclass, 'clock':self.fxns['ControlSig'].clock}
+
+def test_converge_classification():
+    mdl = ClockTank()
+    for staged in [False, True]:
+        endclass = propagate.one_fault(mdl, 'ControlSig', 'glitch', time=10, staged=staged, converge=True)[0]['classification']
+        assert endclass==propagate.one_fault(mdl, 'ControlSig', 'glitch', time=10, staged=staged)[0]['classification']
+        assert endclass['clock']==30
+        check_same_results(propagate.single_faults(mdl, staged=staged, converge=True), propagate.single_faults(mdl, staged=staged))
+
+def test_iter_approach():
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    ref_endclasses, ref_mdlhists = propagate.approach(mdl, app, staged=True)
+    for pool in [False, 2]:
+        results = list(propagate.iter_approach(mdl, app, staged=True, pool=pool))
+        assert [scenname for scenname, _, _ in results]==list(ref_mdlhists)
+        endclasses = {scenname:endclass for scenname, endclass, _ in results[1:]}
+        check_same_results((endclasses, {scenname:mdlhist for scenname, _, mdlhist in results}), (ref_endclasses, ref_mdlhists))
+
+def test_track_spec():
+    mdl = Tank()
+    track = {'functions':{'StoreWat':['level']}, 'flows':{'Wat_out':['rate']}, 'faults':False}
+    for staged in [False, True]:
+        _, _, ref_mdlhists = propagate.one_fault(mdl, 'ImportWat', 'no_wat', time=5, staged=staged)
+        _, _, mdlhists = propagate.one_fault(mdl, 'ImportWat', 'no_wat', time=5, staged=staged, track=track)
+        for scen in ['nominal', 'faulty']:
+            assert list(mdlhists[scen]['functions'])==['StoreWat'] and list(mdlhists[scen]['flows'])==['Wat_out']
+            assert all(mdlhists[scen]['functions']['StoreWat']['level']==ref_mdlhists[scen]['functions']['StoreWat']['level'])
+        reshist, _, summary = rd.process.hist(mdlhists)
+        assert summary['degraded functions']==['StoreWat'] and summary['degraded flows']==['Wat_out']
+
+def test_track_stride():
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    _, ref_mdlhists = propagate.approach(mdl, app)
+    track = {'flows':{'Wat_out':['rate']}, 'functions':{'StoreWat':['level']}, 'stride':7, 'window':2}
+    fulltrack = {**propagate.get_trackspec(mdl), 'stride':7, 'window':2} #(convergence is checked on every state)
+    for staged, pool, converge in [(False, False, False), (True, False, True), (True, 2, False)]:
+        _, mdlhists = propagate.approach(mdl, app, staged=staged, track=fulltrack if converge else track, pool=pool, converge=converge)
+        times = mdlhists['nominal']['time']
+        assert set(times)=={*range(0,31,7), 30, *[t+i for t in app.times for i in range(-2,3)]}
+        for scen, mdlhist in mdlhists.items():
+            inds = [list(ref_mdlhists[scen]['time']).index(t) for t in mdlhist['time']]
+            assert all(mdlhist['time']==times)
+            assert all(mdlhist['flows']['Wat_out']['rate']==ref_mdlhists[scen]['flows']['Wat_out']['rate'][inds])
+            assert all(mdlhist['functions']['StoreWat']['faults']==ref_mdlhists[scen]['functions']['StoreWat']['faults'][inds])
+
+def test_nomcache():
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    ref_results = propagate.approach(mdl, app, staged=True)
+    propagate.cache_nominal(maxsize=2)
+    try:
+        results = propagate.approach(mdl, app, staged=True)
+        check_same_results(results, ref_results)
+        check_same_results(propagate.approach(mdl, app, staged=True), ref_results)
+        assert propagate.approach(mdl, app, staged=True)[1]['nominal'] is results[1]['nominal']
+        _, _, mdlhists = propagate.one_fault(mdl, 'ImportWat', 'no_wat', time=5)
+        assert propagate.one_fault(mdl, 'ImportWat', 'no_wat', time=5)[2]['nominal'] is mdlhists['nominal']
+        propagate.nominal(mdl)
+        assert len(propagate.nomcache['runs'])==2
+        assert propagate.approach(mdl, app, staged=True)[1]['nominal'] is not results[1]['nominal']
+    finally:
+        propagate.cache_nominal(maxsize=0)
+    assert not propagate.nomcache['runs']
+
+def test_faults_at():
+    mdl = Tank()
+    faultlist = [('ImportWat', 'no_wat', 5), ('StoreWat', 'leak', 12), ('ImportWat', 'stuck', 5), ('ControlSig', 'glitch', 25)]
+    for staged in [False, True]:
+        results = propagate.faults_at(mdl, faultlist, staged=staged)
+        assert list(results)==faultlist
+        for (fxnname, faultmode, time), (endresults, _, mdlhists) in results.items():
+            ref_endresults, _, ref_mdlhists = propagate.one_fault(mdl, fxnname, faultmode, time=time, staged=staged)
+            assert endresults['classification']==ref_endresults['classification'] and endresults['faults']==ref_endresults['faults']
+            check_same_results(({}, mdlhists), ({}, ref_mdlhists))
+
+def test_get_set_state():
+    mdl = Tank()
+    flowstates = {}
+    for t in range(12): flowstates = propagate.propagate(mdl, [], t, flowstates)
+    state = mdl.get_state()
+    assert state['fxns']['StoreWat']['states']=={'level':5.0} and state['flows']['Sig']=={'open':1.0}
+    for t in range(12, 25): flowstates = propagate.propagate(mdl, [], t, flowstates)
+    assert mdl.get_state()!=state
+    mdl.set_state(state)
+    assert mdl.get_state()==state and mdl.fxns['StoreWat'].faults is not state['fxns']['StoreWat']['faults']
+
+class CountSig(ControlSig):
+    def __init__(self, flows):
+        FxnBlock.__init__(self, ['Sig'], flows, {'count':0})
+        self.failrate=1e-6
+        self.assoc_modes({'no_sig':[0.5, [1,1], 100], 'glitch':[0.5, [1,1], 10]})
+        self.calls=0
+    def behavior(self, time):
+        if time>self.time: self.calls+=1
+        self.count=self.calls
+        super().behavior(time)
+class SavedCountSig(CountSig):
+    _savedatts = ('calls',)
+class CountTank(Tank):
+    def __init__(self, params={}):
+        super().__init__(params=params)
+        self.add_fxn('ControlSig', ['Sig'], fclass=CountSig)
+        self.construct_graph()
+class SavedCountTank(Tank):
+    def __init__(self, params={}):
+        super().__init__(params=params)
+        self.add_fxn('ControlSig', ['Sig'], fclass=SavedCountSig)
+        self.construct_graph()
+
+def test_reuse():
+    mdl = Tank()
+    ref_results = propagate.single_faults(mdl)
+    check_same_results(propagate.single_faults(mdl, reuse=True), ref_results)
+    check_same_results(propagate.single_faults(mdl, reuse='verify', pool=2), ref_results)
+    with pytest.raises(Exception, match='ControlSig.count'):
+        propagate.single_faults(CountTank(), reuse='verify')
+    check_same_results(propagate.single_faults(mdl, staged=True, reuse='verify'), propagate.single_faults(mdl, staged=True))
+    with pytest.raises(Exception, match='ControlSig.count'):
+        propagate.single_faults(CountTank(), staged=True, cstride=7, reuse='verify')
+    mdl = SavedCountTank()
+    check_same_results(propagate.single_faults(mdl, staged=True, cstride=7, reuse='verify'), propagate.single_faults(mdl))
+
+class ErrorSig(ControlSig):
+    def behavior(self, time):
+        if time>=5 and self.has_fault('no_sig'): raise ZeroDivisionError("no signal")
+        super().behavior(time)
+class ErrorTank(Tank):
+    def __init__(self, params={}):
+        super().__init__(params=params)
+        self.add_fxn('ControlSig', ['Sig'], fclass=ErrorSig)
+        self.construct_graph()
+
+def test_prop_error():
+    with pytest.raises(ZeroDivisionError, match="t=5 in scenario {'ControlSig': 'no_sig'}: no signal"):
+        propagate.one_fault(ErrorTank(), 'ControlSig', 'no_sig', time=3)
+
+def test_state_vector():
+    mdl = Tank()
+    schema = mdl.state_schema()
+    assert ('flows', 'Wat_out', 'rate') in schema and ('fxns', 'StoreWat', 'level') in schema
+    flowstates = {}
+    for t in range(25): flowstates = propagate.propagate(mdl, [], t, flowstates)
+    vec = mdl.to_vector(schema)
+    assert vec.dtype==np.float64 and len(vec)==len(schema)
+    newmdl = Tank()
+    assert not np.all(newmdl.to_vector(schema)==vec)
+    newmdl.from_vector(vec, schema)
+    assert np.all(newmdl.to_vector()==vec) and newmdl.fxns['StoreWat'].level==mdl.fxns['StoreWat'].level
+
+def test_skip_steady():
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    for staged in [False, True]:
+        check_same_results(propagate.approach(mdl, app, staged=staged, skip_steady=True), propagate.approach(mdl, app, staged=staged))
+    nomscen = propagate.construct_nomscen(mdl)
+    ref_mdlhist, _, _ = propagate.prop_one_scen(Tank(), nomscen)
+    countmdl = CountTank()
+    mdlhist, _, _ = propagate.prop_one_scen(countmdl, nomscen, skip_steady=True)
+    check_same_results(({}, {'nominal':mdlhist}), ({}, {'nominal':ref_mdlhist}))
+    assert countmdl.fxns['ControlSig'].calls < len(mdlhist['time'])
+
+def test_profile():
+    mdl = Tank()
+    propagate.clear_profile()
+    propagate.profile_propagation()
+    try:
+        _, _, mdlhist = propagate.nominal(mdl)
+        report = propagate.get_profile()
+        propagate.clear_profile()
+        propagate.one_fault(mdl, 'ImportWat', 'no_wat', time=5)
+        faultreport = propagate.get_profile()
+    finally:
+        propagate.profile_propagation(False)
+    assert report['steps']['time'] == list(mdlhist['time'])
+    assert all(n >= 1 for n in report['steps']['iterations'])
+    assert set(report['functions']) == set(mdl.fxns)
+    assert sum(fxn['calls'] for fxn in report['functions'].values()) == sum(report['steps']['active functions'])
+    assert list(rd.tabulate.profilefxns(report)['calls']) == [report['functions'][fxn]['calls'] for fxn in rd.tabulate.profilefxns(report).index]
+    assert len(rd.tabulate.profilesteps(report)) == len(mdlhist['time'])
+    #(updates of functions with injected faults are counted in both)
+    assert sum(rd.tabulate.profilefxns(faultreport)['calls']) == sum(rd.tabulate.profilesteps(faultreport)['active functions'])
+    propagate.clear_profile()
+    propagate.nominal(mdl)
+    assert propagate.get_profile() == {'functions':{}, 'steps':{'time':[], 'iterations':[], 'active functions':[]}}
+
+def test_loops():
+    mdl = LoopTank()
+    endresults, _, _ = propagate.nominal(mdl)
+    assert 'loops' not in endresults['classification']
+    endresults, _, _ = propagate.one_fault(mdl, 'ControlSig', 'oscillate', time=5)
+    loops = endresults['classification']['loops']
+    assert [loop['time'] for loop in loops] == list(np.arange(5, 31, dtype=float))
+    assert all(loop['type']=='cycle' and loop['iterations']<mdl.maxiter for loop in loops)
+    assert all('ControlSig' in loop['functions'] and 'Sig' in loop['flows'] for loop in loops)
+    endresults, _, _ = propagate.one_fault(mdl, 'ControlSig', 'drift', time=5)
+    assert all(loop['type']=='maxiter' and loop['iterations']==mdl.maxiter for loop in endresults['classification']['loops'])
+    app = SampleApproach(mdl, faults=[('ControlSig', 'oscillate'), ('ControlSig', 'drift')], defaultsamp={'samp':'evenspacing', 'numpts':3})
+    endclasses, _ = propagate.approach(mdl, app)
+    assert all(endclass['loops'] and all(loop['time']>=scen['properties']['time'] for loop in endclass['loops']) \
+               for scen in app.scenlist for endclass in [endclasses[scen['properties']['name']]])
+    check_same_results(propagate.approach(mdl, app, staged=True), (endclasses, {}))
+
+def test_fxnorder():
+    mdl = Tank()
+    assert mdl.fxnorder == {'ControlSig':0, 'ImportWat':1, 'StoreWat':2}
+    assert set(mdl.fxngraph.edges) == {('ControlSig', 'ImportWat'), ('ImportWat', 'ControlSig'), ('ImportWat', 'StoreWat'), ('StoreWat', 'ImportWat')}
+    propagate.clear_profile()
+    propagate.profile_propagation()
+    try:
+        propagate.nominal(mdl)
+    finally:
+        propagate.profile_propagation(False)
+    report = propagate.get_profile()
+    assert report['steps']['iterations'][0] == 1 #(all functions are updated once, in order, in the first time-step)
+    propagate.clear_profile()
+
+def test_flow_directions():
+    mdl = DirTank()
+    assert mdl.flowreaders == {'Wat_in':{'StoreWat'}, 'Wat_out':{'StoreWat'}, 'Sig':{'ImportWat'}}
+    assert set(mdl.fxngraph.edges) == {('ControlSig', 'ImportWat'), ('ImportWat', 'StoreWat')}
+    tank = Tank() #(functions without declared inputs/outputs do not share the default lists)
+    assert tank.fxns['ControlSig'].inputs==[] and tank.fxns['ControlSig'].inputs is not tank.fxns['StoreWat'].inputs
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    calls = {}
+    for model in [Tank(), mdl]:
+        propagate.clear_profile()
+        propagate.profile_propagation()
+        try:
+            calls[model.__class__] = propagate.approach(model, app)
+        finally:
+            propagate.profile_propagation(False)
+        calls[model.__class__] += (sum(fxn['calls'] for fxn in propagate.get_profile()['functions'].values()),)
+    check_same_results(calls[DirTank][:2], calls[Tank][:2])
+    assert calls[DirTank][2] < calls[Tank][2]
+    propagate.clear_profile()
+    with pytest.raises(ValueError, match='Wat_in'):
+        mdl.add_fxn('ExportWat', ['Wat_out'], inputs=['Wat_in'])
+
+class PosSource(FxnBlock):
+    def __init__(self, flows):
+        super().__init__(['Pos'], flows)
+    def behavior(self, time):
+        self.Pos.x = [time]
+class InPlacePosSource(PosSource):
+    def behavior(self, time):
+        self.Pos.x[0] = time
+class PosReader(FxnBlock):
+    def __init__(self, flows):
+        super().__init__(['Pos'], flows, {'x':0.0}, timely=False)
+    def behavior(self, time):
+        self.x = self.Pos.x[0]
+class PosModel(Model):
+    def __init__(self, params={'source':PosSource}):
+        super().__init__(params=params, modelparams={'times':[0,5], 'tstep':1})
+        self.add_flow('Pos', {'x':[0.0]})
+        self.add_fxn('PosSource', ['Pos'], fclass=params['source'])
+        self.add_fxn('PosReader', ['Pos'], fclass=PosReader)
+        self.construct_graph()
+
+def test_flow_mutation():
+    #functions reading a flow are only updated when its attributes are set (not when they are modified in place)
+    for source, x in [(PosSource, 5.0), (InPlacePosSource, 0.0)]:
+        mdl = PosModel(params={'source':source})
+        propagate.prop_one_scen(mdl, propagate.construct_nomscen(mdl), track=False)
+        assert mdl.fxns['PosReader'].x==x
+
+def test_batch():
+    mdl = BatchTank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    ref_results = propagate.approach(LoopTank(), app)
+    assert any('loops' in endclass for endclass in ref_results[0].values())
+    check_same_results(propagate.approach(mdl, app), ref_results)
+    for batch in [4, len(app.scenlist)]:
+        check_same_results(propagate.approach(mdl, app, batch=batch), ref_results)
+    with pytest.raises(ValueError, match='pool'):
+        propagate.approach(mdl, app, batch=4, pool=2)
+
+def test_dedup():
+    mdl = LoopTank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'fullint'})
+    endclasses, mdlhists = propagate.approach(mdl, app, staged=True, dedup=True)
+    summary = rd.tabulate.dedupsummary(endclasses)
+    assert 0 < summary['runs saved'].sum() < len(summary) < len(app.scenlist)
+    assert all(endclasses[scen]['reused']['scenario'] in endclasses for scen in summary.index)
+    for endclass in endclasses.values(): endclass.pop('reused', None)
+    check_same_results((endclasses, mdlhists), propagate.approach(mdl, app, staged=True))
+    with pytest.raises(ValueError, match='staged'):
+        propagate.approach(mdl, app, dedup=True)
+
+class UnboundedTank(Tank):
+    expcost_bound = Model.expcost_bound
+
+def test_costtol():
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    endclasses, _ = propagate.approach(mdl, app)
+    assert all(abs(endclass['expected cost']) <= mdl.expcost_bound(scen) for scen in app.scenlist for endclass in [endclasses[scen['properties']['name']]])
+    costtol = 0.5*rd.process.totalcost(endclasses)
+    tol_endclasses, _ = propagate.approach(mdl, app, costtol=costtol)
+    assert len(tol_endclasses) < len(endclasses)
+    bounds = [mdl.expcost_bound(scen) for scen in app.scenlist if scen['properties']['name'] in tol_endclasses]
+    assert min(bounds) >= max(mdl.expcost_bound(scen) for scen in app.scenlist if scen['properties']['name'] not in tol_endclasses)
+    error = rd.process.totalcost_error(tol_endclasses)
+    assert error <= costtol
+    assert abs(rd.process.totalcost(endclasses) - rd.process.totalcost(tol_endclasses)) <= error
+    assert list(tol_endclasses)==[scenname for scenname in endclasses if scenname in tol_endclasses]
+    executors = []
+    assert propagate.approach(mdl, app, costtol=costtol, pool=count_pool(executors))[0]==tol_endclasses
+    assert len(executors[0].futures) < len(app.scenlist)
+    all_endclasses, _ = propagate.approach(mdl, app, costtol=0.0)
+    assert list(all_endclasses)==list(endclasses)
+    assert rd.process.totalcost_error(all_endclasses) == 0.0
+    assert all({**endclass, 'error bound':0}=={**endclasses[scen], 'error bound':0} for scen, endclass in all_endclasses.items())
+    with pytest.warns(UserWarning):
+        propagate.approach(UnboundedTank(), app, costtol=0.0)
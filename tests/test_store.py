@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of saving and loading results with fmdtools.resultdisp.store
+
+- uses the tank model from test_propagate to check that results loaded from disk are the same as the results saved
+"""
+import sys
+import itertools
+import multiprocessing as mp
+import numpy as np
+import pytest
+sys.path.append('../')
+from fmdtools.modeldef import SampleApproach
+import fmdtools.faultsim.propagate as propagate
+import fmdtools.resultdisp as rd
+from tests.test_propagate import Tank, ManyTank, check_same_results
+
+def test_save_load(tmp_path, monkeypatch):
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    endclasses, mdlhists = propagate.approach(mdl, app, staged=True)
+    rd.store.save_results(str(tmp_path), endclasses, mdlhists)
+    loaded_endclasses, loaded_mdlhists = rd.store.load_results(str(tmp_path))
+    assert list(loaded_mdlhists)==list(mdlhists)
+    check_same_results((loaded_endclasses, loaded_mdlhists), (endclasses, mdlhists))
+    with monkeypatch.context() as m: #(only the endclasses are read until the histories are accessed)
+        m.setattr(rd.store, 'load_hist', lambda *args: pytest.fail("history loaded"))
+        assert rd.store.load_results(str(tmp_path))[0]==loaded_endclasses
+    scen = app.scenlist[0]['properties']['name']
+    hist = loaded_mdlhists[scen]
+    assert isinstance(hist['flows']['Wat_out']['rate'], np.memmap)
+    assert hist['faultmodes']==mdlhists[scen]['faultmodes']
+    assert rd.process.faultsets(hist, 'ImportWat')==rd.process.faultsets(mdlhists[scen], 'ImportWat')
+    comp_hists = {'nominal':loaded_mdlhists['nominal'], 'faulty':hist}
+    reshist, _, summary = rd.process.hist(comp_hists)
+    assert summary==rd.process.hist({'nominal':mdlhists['nominal'], 'faulty':mdlhists[scen]})[2]
+    assert rd.tabulate.hist(comp_hists).shape==rd.tabulate.hist({'nominal':mdlhists['nominal'], 'faulty':mdlhists[scen]}).shape
+
+def test_save_load_faultsets(tmp_path):
+    _, _, mdlhists = propagate.one_fault(ManyTank(), 'ControlSig', 'mode65', time=5)
+    rd.store.save_scen(str(tmp_path), 'faulty', {}, mdlhists['faulty'])
+    hist = rd.store.load_scen(str(tmp_path), 'faulty')[1]
+    assert hist['faultmodes']['ControlSig'] is None
+    assert rd.process.faultsets(hist, 'ControlSig')==rd.process.faultsets(mdlhists['faulty'], 'ControlSig')
+
+def test_partial_save(tmp_path):
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    results = propagate.iter_approach(mdl, app)
+    for scenname, endclass, mdlhist in itertools.islice(results, 3):
+        rd.store.save_scen(str(tmp_path), scenname, endclass, mdlhist)
+    (tmp_path/rd.store.scen_path('', 'unfinished')).mkdir()
+    endclasses, mdlhists = rd.store.load_results(str(tmp_path))
+    assert len(mdlhists)==3 and len(endclasses)==2
+
+def test_journal(tmp_path):
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    ref_results = propagate.approach(mdl, app, staged=True)
+    for pool in [False, 2]:
+        journal = str(tmp_path/str(pool))
+        for _ in itertools.islice(propagate.iter_approach(mdl, app, staged=True, pool=pool, journal=journal), 4): pass
+        finished = rd.store.saved_scens(journal)
+        assert finished==list(ref_results[1])[:4]
+        #finished scenarios are loaded from the journal rather than re-run
+        rd.store.save_scen(journal, finished[-1], {'rerun':False}, rd.store.load_scen(journal, finished[-1])[1])
+        endclasses, mdlhists = propagate.approach(mdl, app, staged=True, pool=pool, journal=journal)
+        assert endclasses.pop(finished[-1])=={'rerun':False}
+        check_same_results((endclasses, mdlhists), ({k:v for k,v in ref_results[0].items() if k!=finished[-1]}, ref_results[1]))
+        assert rd.store.saved_scens(journal)==list(ref_results[1])
+
+def test_parallel_save(tmp_path):
+    mdl = Tank()
+    app = SampleApproach(mdl, defaultsamp={'samp':'evenspacing', 'numpts':3})
+    endclasses, mdlhists = propagate.approach(mdl, app)
+    with mp.Pool(4) as pool:
+        pool.starmap(rd.store.save_scen, [(str(tmp_path), scenname, endclasses.get(scenname, {}), mdlhist) for scenname, mdlhist in mdlhists.items()])
+    loaded_endclasses, loaded_mdlhists = rd.store.load_results(str(tmp_path))
+    assert set(loaded_mdlhists)==set(mdlhists)
+    check_same_results(({scenname:loaded_endclasses[scenname] for scenname in endclasses}, loaded_mdlhists), (endclasses, mdlhists))